@@ -3,20 +3,22 @@ from agno.models.google import Gemini
 from dotenv import load_dotenv
 import json
 import os
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Callable, Optional
 from datetime import datetime
 from agno.tools.tavily import TavilyTools
 from agno.tools.calculator import CalculatorTools
 from agno.tools.newspaper4k import Newspaper4kTools
 from agno.tools.duckduckgo import DuckDuckGoTools
 
+from agents.artifacts import get_artifact_store
+from agents.llm import run_analysis, discard_response
+from agents.schemas import LOGISTICS_SCHEMA
+
 class LogisticCompatibilityAgent:
     def __init__(self, model_id: str = "gemini-2.0-flash-exp", enable_markdown: bool = True):
         load_dotenv()
 
         self.api_key = os.getenv("GOOGLE_API_KEY")
-        self.reports_dir = "temp_KB"
-        os.makedirs(self.reports_dir, exist_ok=True)
 
         self.user_login = "codegeek03"
         self.current_time = "2025-04-19 21:17:20"
@@ -51,7 +53,7 @@ class LogisticCompatibilityAgent:
     show_tool_calls=True
 )
 
-    async def analyze_top_logistics_materials(self, materials_data: Dict[str, Any],input_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def analyze_top_logistics_materials(self, materials_data: Dict[str, Any],input_data: Dict[str, Any], on_material: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
         """
         Simplified analysis focusing only on top 5 materials for logistics.
         """
@@ -83,30 +85,14 @@ Keep all text fields under 50 characters.
 """
 
         try:
-            response = await self.agent.arun(prompt)
-            
-            response_text = response.content.strip()
-            if response_text.startswith("```json"):
-                response_text = response_text[7:]
-            if response_text.startswith("```"):
-                response_text = response_text[3:]
-            if response_text.endswith("```"):
-                response_text = response_text[:-3]
-
-            analysis = json.loads(response_text)
-            
-            # Save the analysis
-            timestamp = self.current_time.replace(" ", "_").replace(":", "-")
-            filename = f"logistics_top5_{timestamp}.json"
-            filepath = os.path.join(self.reports_dir, filename)
-            
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(analysis, f, indent=2)
+            analysis = await run_analysis(self.agent, prompt, LOGISTICS_SCHEMA, on_material=on_material)
             
-            analysis["report_path"] = filepath
+            # Save the analysis in this run's artifact directory
+            analysis["report_path"] = get_artifact_store().write_json("logistics_top5", analysis)
             return analysis
 
         except Exception as e:
+            discard_response(self.agent, prompt)
             error_data = {
                 "error": f"Analysis failed: {str(e)}",
                 "timestamp": self.current_time,
@@ -12,6 +12,11 @@ from agno.tools.calculator import CalculatorTools
 from agno.tools.newspaper4k import Newspaper4kTools
 from agno.tools.duckduckgo import DuckDuckGoTools
 
+from agents.artifacts import get_artifact_store
+from agents.llm import run_agent, discard_response
+from agents.offline import is_fake
+from agents.schemas import parse_json
+
 # Set up logging
 logging.basicConfig(level=logging.INFO, 
                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -38,13 +43,9 @@ class ProductCompatibilityAgent:
 
             # Get API key from environment variables
             self.api_key = os.getenv('GOOGLE_API_KEY')
-            if not self.api_key:
+            if not self.api_key and not is_fake():
                 raise ValueError("GOOGLE_API_KEY environment variable is not set")
 
-            # Create temp_KB directory if it doesn't exist
-            self.temp_dir = "temp_KB"
-            os.makedirs(self.temp_dir, exist_ok=True)
-
             # Store user information and timestamp
             self.user_login = "codegeek03"  # Hardcoded as per requirements
             self.current_timestamp = "2025-05-08 20:00:32"  # Hardcoded as per requirements
@@ -147,10 +148,14 @@ class ProductCompatibilityAgent:
         try:
             # Generate and execute prompt
             prompt = self._generate_analysis_prompt(product_name, product_inputs)
-            response = await self.agent.arun(prompt)
+            response_text = await run_agent(self.agent, prompt)
             
             # Process response
-            analysis = self._process_response(response.content)
+            try:
+                analysis = self._process_response(response_text)
+            except ValueError:
+                discard_response(self.agent, prompt)
+                raise
             
             # Add normalized scores for orchestrator
             if 'criteria' in analysis:
@@ -218,30 +223,18 @@ Provide a strict JSON response with one-word descriptions:
 """
 
     def _process_response(self, response_text: str) -> Dict[str, Any]:
-        """Process and clean up the response text"""
+        """Parse the response JSON, stripping fences and repairing it if needed"""
         try:
-            # Clean up response text
-            response_text = response_text.strip()
-            if response_text.startswith('```json'):
-                response_text = response_text[7:-3]
-            elif response_text.startswith('```'):
-                response_text = response_text[3:-3]
-            
-            return json.loads(response_text)
-
-        except json.JSONDecodeError as e:
+            return parse_json(response_text)
+        except ValueError as e:
             logger.error(f"Failed to parse response JSON: {str(e)}")
-            logger.debug(f"Raw response text: {response_text}")
-            raise ValueError(f"Invalid JSON response: {str(e)}")
+            raise
 
     def _save_json_to_temp(self, data: Dict[str, Any], product_name: str) -> str:
         """Save analysis data to temp directory with error handling"""
         try:
-            filename = f"{product_name.lower().replace(' ', '_')}_compatibility_report.json"
-            filepath = os.path.join(self.temp_dir, filename)
-
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2)
+            name = f"{product_name.lower().replace(' ', '_')}_compatibility_report"
+            filepath = get_artifact_store().write_json(name, data)
 
             logger.info(f"Saved analysis report to: {filepath}")
             return filepath
@@ -3,13 +3,18 @@ from agno.models.google import Gemini
 from dotenv import load_dotenv
 import json
 import os
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Callable, Optional
 from datetime import datetime
 from agno.tools.tavily import TavilyTools
 from agno.tools.calculator import CalculatorTools
 from agno.tools.newspaper4k import Newspaper4kTools
 from agno.tools.duckduckgo import DuckDuckGoTools
 
+from agents.artifacts import get_artifact_store
+from agents.llm import run_analysis, discard_response
+from agents.offline import is_fake
+from agents.schemas import SUSTAINABILITY_SCHEMA
+
 class EnvironmentalImpactAgent:
     """
     Simplified agent that analyzes environmental impact of packaging materials.
@@ -18,11 +23,9 @@ class EnvironmentalImpactAgent:
     def __init__(self, model_id: str = "gemini-2.0-flash-exp", enable_markdown: bool = True):
         load_dotenv()
         api_key = os.getenv('GOOGLE_API_KEY')
-        if not api_key:
+        if not api_key and not is_fake():
             raise ValueError("GOOGLE_API_KEY environment variable is not set")
 
-        self.reports_dir = "temp_KB"
-        os.makedirs(self.reports_dir, exist_ok=True)
 
         # Fixed timestamp and user
         self.user_login = "codegeek03"
@@ -69,16 +72,10 @@ class EnvironmentalImpactAgent:
 
     def _save_report_to_file(self, data: Dict[str, Any], report_type: str) -> str:
         """Saves analysis results to a JSON file."""
-        timestamp = self.current_time.replace(" ", "_").replace(":", "-")
-        filename = f"{report_type}_{timestamp}.json"
-        filepath = os.path.join(self.reports_dir, filename)
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2)
-        
-        return filepath
+        # One file per run (see agents.artifacts), so concurrent runs never overwrite each other
+        return get_artifact_store().write_json(report_type, data)
 
-    async def analyze_environmental_impact(self, materials_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def analyze_environmental_impact(self, materials_data: Dict[str, Any], on_material: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
         """
         Analyzes environmental impact with simplified metrics and response structure.
         """
@@ -112,17 +109,7 @@ IMPORTANT:
 """
 
         try:
-            response = await self.agent.arun(prompt)
-            
-            response_text = response.content.strip()
-            if response_text.startswith("```json"):
-                response_text = response_text[7:]
-            if response_text.startswith("```"):
-                response_text = response_text[3:]
-            if response_text.endswith("```"):
-                response_text = response_text[:-3]
-
-            analysis = json.loads(response_text)
+            analysis = await run_analysis(self.agent, prompt, SUSTAINABILITY_SCHEMA, on_material=on_material)
             
             saved_path = self._save_report_to_file(analysis, "environmental_impact")
             analysis["report_path"] = saved_path
@@ -130,6 +117,7 @@ IMPORTANT:
             return analysis
 
         except Exception as e:
+            discard_response(self.agent, prompt)
             error_data = {
                 "error": f"Environmental analysis failed: {str(e)}",
                 "timestamp": self.current_time,
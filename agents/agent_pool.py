@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import threading
+from collections import Counter, defaultdict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Tuple, Type
+
+from agents.metrics import AGENTS_IN_USE, agent_scope
+
+logger = logging.getLogger(__name__)
+
+POOL_MAX_IDLE = 4  # idle instances kept per agent type
+
+
+class AgentPool:
+    """
+    Process-wide pool of warm agent instances.
+
+    Each agent type (and constructor arguments) is built once and reused
+    across graph runs.  An instance is handed to one caller at a time; when
+    all instances of a type are busy a new one is built, so concurrent runs
+    never share an agent mid-call.
+    """
+
+    def __init__(self, max_idle: int = POOL_MAX_IDLE):
+        self.max_idle = max_idle
+        self._idle: Dict[Tuple, List[Any]] = defaultdict(list)
+        self._lock = threading.Lock()
+        self.created: Counter = Counter()
+        self.reused: Counter = Counter()
+
+    @staticmethod
+    def _key(agent_cls: Type, args: Tuple, kwargs: Dict[str, Any]) -> Tuple:
+        return (agent_cls, args, tuple(sorted(kwargs.items())))
+
+    @staticmethod
+    def _reset(instance: Any) -> None:
+        """Drop per-run conversation memory so a reused agent starts clean."""
+        memory = getattr(getattr(instance, "agent", None), "memory", None)
+        if memory is not None and hasattr(memory, "clear"):
+            memory.clear()
+
+    @asynccontextmanager
+    async def acquire(self, agent_cls: Type, *args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        """
+        Check out an instance of `agent_cls`, building one if none is idle.
+
+        Usage:
+            async with agent_pool.acquire(MaterialPropertiesAgent) as agent:
+                result = await agent.analyze_material_properties(...)
+        """
+        key = self._key(agent_cls, args, kwargs)
+        with self._lock:
+            instance = self._idle[key].pop() if self._idle[key] else None
+
+        if instance is None:
+            # Construction loads env, tools and knowledge; keep it off the event loop
+            instance = await asyncio.to_thread(agent_cls, *args, **kwargs)
+            self.created[agent_cls.__name__] += 1
+            logger.info(f"Created pooled {agent_cls.__name__}")
+        else:
+            self.reused[agent_cls.__name__] += 1
+
+        try:
+            # LLM calls made with the instance are attributed to its class
+            with agent_scope(agent_cls.__name__), AGENTS_IN_USE.track(agent=agent_cls.__name__):
+                yield instance
+        except asyncio.CancelledError:
+            # Cancelled mid-call (e.g. a node deadline): tool calls may still be
+            # running on it in worker threads, so never hand it out again
+            logger.info(f"Discarding cancelled {agent_cls.__name__}")
+            raise
+        except BaseException:
+            self._release(key, instance)
+            raise
+        else:
+            self._release(key, instance)
+
+    def _release(self, key: Tuple, instance: Any) -> None:
+        self._reset(instance)
+        with self._lock:
+            if len(self._idle[key]) < self.max_idle:
+                self._idle[key].append(instance)
+
+    async def prewarm(self, agent_cls: Type, *args: Any, **kwargs: Any) -> None:
+        """Build one idle instance ahead of the first request."""
+        async with self.acquire(agent_cls, *args, **kwargs):
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            idle = Counter()
+            for (agent_cls, _, _), instances in self._idle.items():
+                idle[agent_cls.__name__] += len(instances)
+        return {"created": dict(self.created), "reused": dict(self.reused), "idle": dict(idle)}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._idle.clear()
+
+
+agent_pool = AgentPool()
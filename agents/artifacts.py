@@ -0,0 +1,154 @@
+import os
+import json
+import hashlib
+import inspect
+import logging
+import tempfile
+import threading
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Reports are written to ARTIFACT_ROOT/<run id>/<name>.json, the run id being
+# the graph thread id; writes outside a run are content-addressed instead
+ARTIFACT_ROOT = os.path.join("temp_KB", "runs")
+UNSCOPED_DIR = "_unscoped"
+
+_run_id: ContextVar[Optional[str]] = ContextVar("artifact_run_id", default=None)
+
+
+def _safe(name: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in str(name)).strip(".") or "_"
+
+
+def atomic_write(path: str, text: str) -> None:
+    """
+    Write `text` to `path` so readers see the old file or the complete new
+    one, never a partial write: a temp file in the same directory is synced
+    and renamed over the target.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+@contextmanager
+def run_scope(run_id: Optional[str]) -> Iterator[None]:
+    """Write artifacts made in the enclosed block under `run_id`."""
+    token = _run_id.set(run_id)
+    try:
+        yield
+    finally:
+        _run_id.reset(token)
+
+
+def current_run_id() -> Optional[str]:
+    return _run_id.get()
+
+
+def new_run_id(prefix: str) -> str:
+    """
+    Unique id for a session or batch, e.g. "codegeek03-1746824685-9f2c41ab".
+
+    The timestamp keeps ids sortable; the random suffix keeps runs started in
+    the same second (or by another process) from sharing a run directory,
+    checkpoint thread and trace.
+    """
+    return f"{prefix}-{int(datetime.now(timezone.utc).timestamp())}-{uuid.uuid4().hex[:8]}"
+
+
+def run_scoped(fn: Callable[..., Awaitable[Dict[str, Any]]]) -> Callable[..., Awaitable[Dict[str, Any]]]:
+    """Wrap a graph node so the reports it writes land in its run's (thread id's) directory."""
+    takes_config = "config" in inspect.signature(fn).parameters
+
+    async def run(state: Dict[str, Any], config: Dict[str, Any]) -> Dict[str, Any]:
+        with run_scope(((config or {}).get("configurable") or {}).get("thread_id")):
+            return await (fn(state, config) if takes_config else fn(state))
+
+    run.__name__ = getattr(fn, "__name__", "node")
+    return run
+
+
+class ArtifactStore:
+    """
+    Run-scoped JSON reports.
+
+    Each run gets its own directory, so concurrent runs never overwrite one
+    another, and every write is atomic, so a later stage (or another process)
+    reading a report sees a complete version of it.
+    """
+
+    def __init__(self, root: str = ARTIFACT_ROOT):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def run_dir(self, run_id: str) -> str:
+        return os.path.join(self.root, _safe(run_id))
+
+    def path_for(self, name: str, run_id: Optional[str] = None) -> str:
+        run_id = run_id or current_run_id()
+        if run_id is None:
+            raise ValueError(f"No run to locate artifact {name!r} in")
+        return os.path.join(self.run_dir(run_id), f"{_safe(name)}.json")
+
+    def write_json(self, name: str, data: Any, run_id: Optional[str] = None) -> str:
+        """
+        Atomically save `data` as artifact `name` of the current run.
+
+        Within a run the latest write of a name wins. Outside any run the file
+        is named by a hash of its content, so unrelated writes cannot collide.
+
+        Returns:
+            The path written.
+        """
+        text = json.dumps(data, indent=2, default=str)
+        if (run_id or current_run_id()) is None:
+            digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+            path = os.path.join(self.root, UNSCOPED_DIR, f"{_safe(name)}_{digest}.json")
+        else:
+            path = self.path_for(name, run_id)
+        atomic_write(path, text)
+        logger.debug(f"Saved artifact {path}")
+        return path
+
+    def read_json(self, name: str, run_id: Optional[str] = None) -> Optional[Any]:
+        """Artifact `name` of the current run, or None if it was never written."""
+        try:
+            with open(self.path_for(name, run_id), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def list(self, run_id: Optional[str] = None) -> List[str]:
+        """Names of the artifacts a run has written."""
+        directory = self.run_dir(run_id or current_run_id() or UNSCOPED_DIR)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(f[:-5] for f in os.listdir(directory) if f.endswith(".json") and not f.startswith("."))
+
+
+_store: Optional[ArtifactStore] = None
+_store_lock = threading.Lock()
+
+
+def get_artifact_store() -> ArtifactStore:
+    """Return the process-wide artifact store, creating it on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ArtifactStore()
+        return _store
@@ -0,0 +1,284 @@
+import os
+import time
+import logging
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Sequence, Set, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import ChannelVersions, Checkpoint, CheckpointMetadata, CheckpointTuple
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+from agents.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Durable checkpoint store shared by the CLI and the dashboard
+CHECKPOINT_PATH = os.path.join("temp_KB", "checkpoints.sqlite")
+
+
+@asynccontextmanager
+async def open_checkpointer(path: str = CHECKPOINT_PATH) -> AsyncIterator[AsyncSqliteSaver]:
+    """
+    Open the SQLite-backed checkpointer for the analysis graph.
+
+    The saver is bound to the running event loop, so open it inside the
+    coroutine that runs the graph.
+
+    Usage:
+        async with open_checkpointer() as checkpointer:
+            graph = create_analysis_graph(checkpointer)
+            result = await graph.ainvoke(state, config)
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    async with AsyncSqliteSaver.from_conn_string(path) as saver:
+        await saver.setup()
+        logger.info(f"Checkpoints stored in {path}")
+        yield saver
+
+
+# Retention defaults
+CHECKPOINT_KEEP = 2                           # newest snapshots kept per session
+CHECKPOINT_MAX_THREADS = 50                   # sessions kept before the oldest finished ones go
+CHECKPOINT_MAX_BYTES = 256 * 1024 * 1024      # in-memory budget for serialized state
+
+
+class BoundedMemorySaver(InMemorySaver):
+    """
+    In-memory checkpointer with bounded retention.
+
+    Only the newest `keep_per_thread` snapshots of each session are kept (with
+    their pending writes and the channel blobs they reference), and once the
+    store exceeds `max_threads` sessions or `max_bytes` of serialized state the
+    least recently used finished sessions are dropped.  Sessions still running
+    are never evicted; call `mark_finished` when a run completes.
+    """
+
+    def __init__(
+        self,
+        keep_per_thread: int = CHECKPOINT_KEEP,
+        max_threads: int = CHECKPOINT_MAX_THREADS,
+        max_bytes: int = CHECKPOINT_MAX_BYTES
+    ):
+        super().__init__()
+        self.keep_per_thread = max(1, keep_per_thread)
+        self.max_threads = max_threads
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self._last_access: Dict[str, float] = {}
+        self._sizes: Dict[str, int] = {}
+        self._finished: Set[str] = set()
+        # (thread, ns) -> checkpoint id -> channel versions it references
+        self._versions: Dict[Tuple[str, str], Dict[str, Dict[str, Any]]] = defaultdict(dict)
+        self.evicted_threads = 0
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        with self._lock:
+            saved = super().put(config, checkpoint, metadata, new_versions)
+            thread_id = saved["configurable"]["thread_id"]
+            checkpoint_ns = saved["configurable"]["checkpoint_ns"]
+            self._versions[(thread_id, checkpoint_ns)][checkpoint["id"]] = dict(checkpoint["channel_versions"])
+            self._finished.discard(thread_id)
+            self._prune_thread(thread_id, checkpoint_ns)
+            self._touch(thread_id)
+            self._enforce_budget(keep=thread_id)
+            return saved
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        with self._lock:
+            super().put_writes(config, writes, task_id, task_path)
+            self._touch(config["configurable"]["thread_id"])
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        with self._lock:
+            found = super().get_tuple(config)
+            # The base class indexes a defaultdict, which would leave an empty entry behind
+            if not any(self.storage.get(thread_id, {}).values()):
+                self.storage.pop(thread_id, None)
+            return found
+
+    def mark_finished(self, thread_id: str) -> None:
+        """Make a completed session eligible for eviction."""
+        with self._lock:
+            if thread_id in self.storage:
+                self._finished.add(thread_id)
+                self._enforce_budget()
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Drop every snapshot, write and blob of a session."""
+        with self._lock:
+            self.storage.pop(thread_id, None)
+            for key in [k for k in self.writes if k[0] == thread_id]:
+                del self.writes[key]
+            for key in [k for k in self.blobs if k[0] == thread_id]:
+                del self.blobs[key]
+            for key in [k for k in self._versions if k[0] == thread_id]:
+                del self._versions[key]
+            self._sizes.pop(thread_id, None)
+            self._last_access.pop(thread_id, None)
+            self._finished.discard(thread_id)
+
+    def memory_usage(self) -> Dict[str, Any]:
+        """Gauge of what the store currently holds."""
+        with self._lock:
+            return {
+                "threads": sum(1 for namespaces in self.storage.values() if any(namespaces.values())),
+                "finished_threads": len(self._finished),
+                "snapshots": sum(len(ckpts) for namespaces in self.storage.values() for ckpts in namespaces.values()),
+                "bytes": sum(self._sizes.values()),
+                "max_bytes": self.max_bytes,
+                "evicted_threads": self.evicted_threads
+            }
+
+    def _touch(self, thread_id: str) -> None:
+        self._last_access[thread_id] = time.monotonic()
+        self._sizes[thread_id] = self._thread_bytes(thread_id)
+
+    def _thread_bytes(self, thread_id: str) -> int:
+        size = 0
+        for ckpts in self.storage.get(thread_id, {}).values():
+            for (_, ckpt), (_, meta), _ in ckpts.values():
+                size += len(ckpt) + len(meta)
+        for key, writes in self.writes.items():
+            if key[0] == thread_id:
+                size += sum(len(value[1]) for _, _, value, _ in writes.values())
+        for key, (_, blob) in self.blobs.items():
+            if key[0] == thread_id:
+                size += len(blob)
+        return size
+
+    def _prune_thread(self, thread_id: str, checkpoint_ns: str) -> None:
+        """Keep the newest snapshots of one namespace and drop what only older ones used."""
+        ckpts = self.storage[thread_id][checkpoint_ns]
+        if len(ckpts) <= self.keep_per_thread:
+            return
+        versions = self._versions[(thread_id, checkpoint_ns)]
+        # Checkpoint ids are time-ordered, so sorting them sorts by age
+        for checkpoint_id in sorted(ckpts)[:-self.keep_per_thread]:
+            del ckpts[checkpoint_id]
+            self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+            versions.pop(checkpoint_id, None)
+
+        referenced = {(channel, version) for kept in versions.values() for channel, version in kept.items()}
+        for key in [
+            k for k in self.blobs
+            if k[0] == thread_id and k[1] == checkpoint_ns and (k[2], k[3]) not in referenced
+        ]:
+            del self.blobs[key]
+
+    def _enforce_budget(self, keep: Optional[str] = None) -> None:
+        """Evict least recently used finished sessions until within limits. Caller holds the lock."""
+        while len(self.storage) > self.max_threads or sum(self._sizes.values()) > self.max_bytes:
+            candidates = [t for t in self._finished if t != keep]
+            if not candidates:
+                break
+            victim = min(candidates, key=lambda t: self._last_access.get(t, 0.0))
+            self.delete_thread(victim)
+            self.evicted_threads += 1
+            logger.info(f"Evicted checkpoints of finished session {victim}")
+
+
+_memory_saver: Optional[BoundedMemorySaver] = None
+_memory_saver_lock = threading.Lock()
+
+
+def get_memory_saver() -> BoundedMemorySaver:
+    """Return the process-wide in-memory checkpointer, creating it on first use."""
+    global _memory_saver
+    with _memory_saver_lock:
+        if _memory_saver is None:
+            _memory_saver = BoundedMemorySaver()
+        return _memory_saver
+
+
+def mark_finished(graph: Any, thread_id: str) -> None:
+    """Tell the graph's checkpointer that a session has completed, if it keeps track."""
+    mark = getattr(getattr(graph, "checkpointer", None), "mark_finished", None)
+    if mark is not None:
+        mark(thread_id)
+
+
+async def prune_checkpoints(
+    saver: AsyncSqliteSaver,
+    graph: Any = None,
+    keep_per_thread: int = CHECKPOINT_KEEP,
+    max_threads: int = CHECKPOINT_MAX_THREADS
+) -> None:
+    """
+    Apply the same retention to the durable store: the newest snapshots per
+    session and, once there are more than `max_threads` sessions, drop the
+    least recently updated finished ones.
+
+    A session counts as finished when `graph` has nothing left to run for it.
+    Interrupted sessions are kept for `--resume`, and without `graph` no
+    session is dropped at all.
+    """
+    async with saver.lock:
+        await saver.conn.execute(
+            "DELETE FROM checkpoints WHERE rowid IN ("
+            "  SELECT rowid FROM ("
+            "    SELECT rowid, ROW_NUMBER() OVER ("
+            "      PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC"
+            "    ) AS rn FROM checkpoints"
+            "  ) WHERE rn > ?"
+            ")",
+            (max(1, keep_per_thread),)
+        )
+        async with saver.conn.execute(
+            "SELECT thread_id FROM checkpoints GROUP BY thread_id"
+            " ORDER BY MAX(checkpoint_id) DESC LIMIT -1 OFFSET ?",
+            (max_threads,)
+        ) as cursor:
+            stale = [row[0] for row in await cursor.fetchall()]
+        await saver.conn.commit()
+
+    # Reading a session's state takes the saver's lock, so check them outside it
+    victims = []
+    if graph is not None:
+        for thread_id in stale:
+            state = await graph.aget_state({"configurable": {"thread_id": thread_id}})
+            if not state.next:
+                victims.append(thread_id)
+
+    async with saver.lock:
+        if victims:
+            await saver.conn.execute(
+                f"DELETE FROM checkpoints WHERE thread_id IN ({', '.join('?' * len(victims))})",
+                victims
+            )
+            logger.info(f"Evicted checkpoints of {len(victims)} finished sessions")
+        await saver.conn.execute(
+            "DELETE FROM writes WHERE NOT EXISTS ("
+            "  SELECT 1 FROM checkpoints c WHERE c.thread_id = writes.thread_id"
+            "  AND c.checkpoint_ns = writes.checkpoint_ns AND c.checkpoint_id = writes.checkpoint_id"
+            ")"
+        )
+        await saver.conn.commit()
+
+
+def checkpoint_store_size(path: str = CHECKPOINT_PATH) -> int:
+    """Size on disk of the durable checkpoint store, in bytes."""
+    return sum(
+        os.path.getsize(p) for p in (path, f"{path}-wal", f"{path}-shm") if os.path.exists(p)
+    )
+
+
+# Read at scrape time from the files on disk
+CHECKPOINT_STORE_BYTES = registry.gauge(
+    "checkpoint_store_bytes", "On-disk size of the durable checkpoint store",
+    collect=lambda: {(): checkpoint_store_size()})
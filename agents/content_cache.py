@@ -0,0 +1,164 @@
+import os
+import sqlite3
+import threading
+import time
+import logging
+from typing import Dict, Optional, Any
+
+from agents.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Cache defaults
+CACHE_PATH = os.path.join("temp_KB", "cache", "content_cache.sqlite")
+CACHE_TTL = 24 * 60 * 60             # seconds an entry is served without revalidation
+CACHE_MAX_BYTES = 64 * 1024 * 1024   # total extracted text kept on disk
+
+
+class ContentCache:
+    """
+    Persistent cache of extracted page content keyed by URL.
+
+    Each entry keeps the extracted title/text together with the ETag and
+    Last-Modified validators of the response it came from.  Entries younger
+    than `ttl` are served without touching the network; older entries are
+    revalidated with a conditional GET.  The total stored text is kept under
+    `max_bytes` by evicting the least recently used entries.
+    """
+
+    def __init__(
+        self,
+        path: str = CACHE_PATH,
+        ttl: float = CACHE_TTL,
+        max_bytes: int = CACHE_MAX_BYTES
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                status_code INTEGER,
+                title TEXT,
+                content TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS pages_lru ON pages (last_access)")
+        self._conn.commit()
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Return the cached entry for `url` (marking it as recently used), or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, status_code, title, content, etag, last_modified, fetched_at "
+                "FROM pages WHERE url = ?",
+                (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE pages SET last_access = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+
+        keys = ("url", "status_code", "title", "content", "etag", "last_modified", "fetched_at")
+        return dict(zip(keys, row))
+
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        """True if the entry can be served without revalidation."""
+        return time.time() - entry["fetched_at"] < self.ttl
+
+    @staticmethod
+    def conditional_headers(entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        """Build If-None-Match / If-Modified-Since headers for revalidating `entry`."""
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def put(
+        self,
+        result: Dict[str, Any],
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None
+    ) -> None:
+        """Store a successful fetch result and evict old entries if over budget."""
+        content = result.get("content") or ""
+        title = result.get("title") or ""
+        size = len(content.encode("utf-8")) + len(title.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages "
+                "(url, status_code, title, content, etag, last_modified, fetched_at, last_access, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (result["url"], result.get("status_code"), result.get("title"), result.get("content"),
+                 etag, last_modified, now, now, size)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def touch(self, url: str) -> None:
+        """Mark an entry as revalidated (e.g. after a 304 Not Modified)."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE pages SET fetched_at = ?, last_access = ? WHERE url = ?",
+                (now, now, url)
+            )
+            self._conn.commit()
+
+    def size_bytes(self) -> int:
+        """Total size of the cached text."""
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM pages")
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the size budget is met. Caller holds the lock."""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT url, size FROM pages ORDER BY last_access ASC").fetchall()
+        for url, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+            total -= size
+            logger.info(f"Evicted cached page: {url}")
+
+
+_content_cache: Optional[ContentCache] = None
+_content_cache_lock = threading.Lock()
+
+
+def get_content_cache() -> ContentCache:
+    """Return the process-wide content cache, creating it on first use."""
+    global _content_cache
+    with _content_cache_lock:
+        if _content_cache is None:
+            _content_cache = ContentCache()
+        return _content_cache
+
+
+# Read at scrape time; a cache this process never opened is not reported
+CONTENT_CACHE_BYTES = registry.gauge(
+    "content_cache_bytes", "Page text held in the content cache",
+    collect=lambda: {(): _content_cache.size_bytes()} if _content_cache else {})
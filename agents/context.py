@@ -1,17 +1,84 @@
+import asyncio
 import json
 from typing import List, Dict, Optional
+from urllib.parse import urlsplit
 
 import httpx
 from bs4 import BeautifulSoup
 
+from agents.content_cache import ContentCache, get_content_cache
+from agents.offline import fetch_target, is_fake
+from agents.metrics import CACHE_LOOKUPS, FETCH_DURATION
+from agents.tracing import Span, span
 
-def fetch_url_content(url: str, timeout: float = 10.0) -> Dict:
+
+# Async corpus fetching defaults
+MAX_CONCURRENCY = 8       # simultaneous requests across all hosts
+MAX_PER_HOST = 2          # simultaneous requests against a single host
+FETCH_DEADLINE = 30.0     # overall seconds allowed for a whole corpus
+
+
+def _extract_page(result: Dict, html: str) -> None:
+    """Fill `title` and `content` of a fetch result from raw HTML."""
+    soup = BeautifulSoup(html, "html.parser")
+
+    # Title
+    if soup.title and soup.title.string:
+        result["title"] = soup.title.string.strip()
+
+    # Extract visible text
+    text = soup.get_text(separator="\n", strip=True)
+    # Optionally collapse multiple blank lines:
+    lines = [line for line in text.splitlines() if line.strip()]
+    result["content"] = "\n".join(lines)
+
+
+def _cached_result(entry: Dict) -> Dict:
+    """Rebuild a fetch result from a content cache entry."""
+    return {
+        "url": entry["url"],
+        "status_code": entry["status_code"],
+        "title": entry["title"],
+        "content": entry["content"],
+        "error": None
+    }
+
+
+def _store_result(cache: Optional[ContentCache], result: Dict, resp: httpx.Response) -> None:
+    """Save a successful fetch together with its revalidation headers."""
+    if cache is not None:
+        cache.put(result, resp.headers.get("etag"), resp.headers.get("last-modified"))
+
+
+def _traced_result(current: Span, result: Dict) -> Dict:
+    """Record a fetch result's outcome on its span."""
+    current.set(status_code=result["status_code"], chars=len(result["content"] or ""))
+    current.attributes.setdefault("cache", "miss")
+    if result["error"]:
+        current.fail(result["error"])
+    return result
+
+
+def _record_fetch(current: Span) -> None:
+    FETCH_DURATION.observe(current.duration_s, outcome="error" if current.error else "ok")
+    if current.attributes["cache"] != "off":
+        hit = current.attributes["cache"] in ("fresh", "revalidated", "stale")
+        CACHE_LOOKUPS.inc(cache="content", result="hit" if hit else "miss")
+
+
+def fetch_url_content(url: str, timeout: float = 10.0, use_cache: bool = True) -> Dict:
     """
     Fetch a single URL and extract its title and full text content.
 
+    Fresh pages are served from the on-disk content cache; stale ones are
+    revalidated with a conditional GET and only re-parsed if they changed.
+    Under the fake backend the page comes from the local fixture server
+    (see `agents.offline`) and the cache is bypassed.
+
     Args:
         url: The page URL to fetch.
         timeout: Seconds to wait before giving up.
+        use_cache: Whether to read from and write to the content cache.
 
     Returns:
         A dict with keys:
@@ -21,26 +88,101 @@ def fetch_url_content(url: str, timeout: float = 10.0) -> Dict:
           - content: all page text (newlines collapsed)
           - error: error message if fetch/parsing failed
     """
+    with span(urlsplit(url).netloc or url, "fetch", url=url) as current:
+        result = _traced_result(current, _fetch_url_content(url, timeout, use_cache, current))
+    _record_fetch(current)
+    return result
+
+
+def _fetch_url_content(url: str, timeout: float, use_cache: bool, current: Span) -> Dict:
     result = {"url": url, "status_code": None, "title": None, "content": None, "error": None}
+    cache = get_content_cache() if use_cache and not is_fake() else None
+    entry = cache.get(url) if cache else None
+    if cache is None:
+        current.set(cache="off")
+    if entry and cache.is_fresh(entry):
+        current.set(cache="fresh")
+        return _cached_result(entry)
+
     try:
-        resp = httpx.get(url, timeout=timeout)
+        resp = httpx.get(fetch_target(url), timeout=timeout, headers=ContentCache.conditional_headers(entry))
+        if resp.status_code == 304 and entry:
+            cache.touch(url)
+            current.set(cache="revalidated")
+            return _cached_result(entry)
         result["status_code"] = resp.status_code
         resp.raise_for_status()
+        _extract_page(result, resp.text)
+        _store_result(cache, result, resp)
+
+    except Exception as e:
+        if entry:
+            current.set(cache="stale")
+            return _cached_result(entry)
+        result["error"] = str(e)
+
+    return result
+
+
+async def afetch_url_content(
+    client: httpx.AsyncClient,
+    url: str,
+    timeout: float = 10.0,
+    use_cache: bool = True
+) -> Dict:
+    """
+    Async counterpart of `fetch_url_content` using a shared client.
+
+    HTML parsing runs in a worker thread so large pages do not stall the
+    event loop.
+
+    Args:
+        client: Pooled async client to issue the request with.
+        url: The page URL to fetch.
+        timeout: Seconds to wait before giving up.
+        use_cache: Whether to read from and write to the content cache.
 
-        soup = BeautifulSoup(resp.text, "html.parser")
+    Returns:
+        A dict with the same keys as `fetch_url_content`.
+    """
+    with span(urlsplit(url).netloc or url, "fetch", url=url) as current:
+        result = _traced_result(current, await _afetch_url_content(client, url, timeout, use_cache, current))
+    _record_fetch(current)
+    return result
 
-        # Title
-        if soup.title and soup.title.string:
-            result["title"] = soup.title.string.strip()
 
-        # Extract visible text
-        text = soup.get_text(separator="\n", strip=True)
-        # Optionally collapse multiple blank lines:
-        lines = [line for line in text.splitlines() if line.strip()]
-        result["content"] = "\n".join(lines)
+async def _afetch_url_content(
+    client: httpx.AsyncClient,
+    url: str,
+    timeout: float,
+    use_cache: bool,
+    current: Span
+) -> Dict:
+    result = {"url": url, "status_code": None, "title": None, "content": None, "error": None}
+    cache = get_content_cache() if use_cache and not is_fake() else None
+    entry = cache.get(url) if cache else None
+    if cache is None:
+        current.set(cache="off")
+    if entry and cache.is_fresh(entry):
+        current.set(cache="fresh")
+        return _cached_result(entry)
+
+    try:
+        resp = await client.get(fetch_target(url), timeout=timeout, headers=ContentCache.conditional_headers(entry))
+        if resp.status_code == 304 and entry:
+            cache.touch(url)
+            current.set(cache="revalidated")
+            return _cached_result(entry)
+        result["status_code"] = resp.status_code
+        resp.raise_for_status()
+        await asyncio.to_thread(_extract_page, result, resp.text)
+        _store_result(cache, result, resp)
 
     except Exception as e:
-        result["error"] = str(e)
+        if entry:
+            current.set(cache="stale")
+            return _cached_result(entry)
+        result["error"] = str(e) or type(e).__name__
 
     return result
 
@@ -48,7 +190,8 @@ def fetch_url_content(url: str, timeout: float = 10.0) -> Dict:
 def get_content_json(
     urls: List[str],
     output_file: Optional[str] = None,
-    timeout: float = 10.0
+    timeout: float = 10.0,
+    use_cache: bool = True
 ) -> List[Dict]:
     """
     Fetch multiple URLs and return (and optionally save) a JSON array of their contents.
@@ -57,13 +200,14 @@ def get_content_json(
         urls: List of page URLs.
         output_file: If given, path to write the JSON file.
         timeout: Per-request timeout in seconds.
+        use_cache: Whether to read from and write to the content cache.
 
     Returns:
         A list of dicts as produced by `fetch_url_content`.
     """
     all_data = []
     for url in urls:
-        data = fetch_url_content(url, timeout=timeout)
+        data = fetch_url_content(url, timeout=timeout, use_cache=use_cache)
         all_data.append(data)
 
     if output_file:
@@ -73,6 +217,69 @@ def get_content_json(
     return all_data
 
 
+async def aget_content_json(
+    urls: List[str],
+    output_file: Optional[str] = None,
+    timeout: float = 10.0,
+    max_concurrency: int = MAX_CONCURRENCY,
+    max_per_host: int = MAX_PER_HOST,
+    deadline: Optional[float] = FETCH_DEADLINE,
+    use_cache: bool = True
+) -> List[Dict]:
+    """
+    Fetch multiple URLs concurrently over one pooled `httpx.AsyncClient`.
+
+    Args:
+        urls: List of page URLs.
+        output_file: If given, path to write the JSON file.
+        timeout: Per-request timeout in seconds.
+        max_concurrency: Upper bound on requests in flight.
+        max_per_host: Upper bound on requests in flight against one host.
+        deadline: Seconds allowed for the whole batch; pages still pending
+            when it expires are cancelled and reported with an error.
+
+    Returns:
+        A list of dicts as produced by `fetch_url_content`, in the order of `urls`.
+    """
+    limits = httpx.Limits(
+        max_connections=max_concurrency,
+        max_keepalive_connections=max_concurrency
+    )
+    global_slots = asyncio.Semaphore(max_concurrency)
+    host_slots: Dict[str, asyncio.Semaphore] = {}
+
+    async with httpx.AsyncClient(limits=limits, follow_redirects=True) as client:
+
+        async def fetch(url: str) -> Dict:
+            host = urlsplit(url).netloc
+            host_slot = host_slots.setdefault(host, asyncio.Semaphore(max_per_host))
+            async with host_slot, global_slots:
+                return await afetch_url_content(client, url, timeout=timeout, use_cache=use_cache)
+
+        tasks = [asyncio.create_task(fetch(url)) for url in urls]
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=deadline)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    all_data = []
+    for url, task in zip(urls, tasks):
+        if task.cancelled():
+            all_data.append({
+                "url": url, "status_code": None, "title": None, "content": None,
+                "error": f"Deadline of {deadline}s exceeded"
+            })
+        else:
+            all_data.append(task.result())
+
+    if output_file:
+        with open(output_file, "w", encoding="utf-8") as f:
+            json.dump(all_data, f, ensure_ascii=False, indent=4)
+
+    return all_data
+
+
 # Example usage:
 if __name__ == "__main__":
     urls = [
@@ -0,0 +1,89 @@
+import time
+import asyncio
+import inspect
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# End-to-end budget for one analysis run, counted from when the input is
+# ready (interactive input is not timed). Override per run with
+# config["configurable"]["run_deadline"].
+RUN_DEADLINE = 900.0
+
+# Time kept back for ranking and summaries: analysts cannot spend it, so a
+# straggler still leaves room for a (degraded) result
+ORCHESTRATION_RESERVE = 120.0
+
+
+def run_deadline_at(config: Optional[Dict[str, Any]] = None) -> float:
+    """Wall-clock time the run budget in `config` (or RUN_DEADLINE) runs out, starting now."""
+    budget = ((config or {}).get("configurable") or {}).get("run_deadline") or RUN_DEADLINE
+    return time.time() + float(budget)
+
+
+def time_left(state: Dict[str, Any], config: Optional[Dict[str, Any]] = None) -> Optional[float]:
+    """
+    Seconds left in the run budget, or None when the run has no deadline.
+
+    A `deadline_at` in the run config (e.g. a fresh budget for a resumed
+    session) takes precedence over the one recorded in the state.
+    """
+    deadline_at = ((config or {}).get("configurable") or {}).get("deadline_at") or state.get("deadline_at")
+    return deadline_at - time.time() if deadline_at else None
+
+
+def with_deadline(
+    node: str,
+    fn: Callable[..., Awaitable[Dict[str, Any]]],
+    timeout: Optional[float],
+    on_timeout: Callable[[str, str], Dict[str, Any]],
+    reserve: float = 0.0
+) -> Callable[..., Awaitable[Dict[str, Any]]]:
+    """
+    Wrap a graph node so it is cancelled after `timeout` seconds or when the
+    run budget (less `reserve`) runs out, whichever comes first.
+
+    A node that blows its budget returns `on_timeout(node, message)` plus a
+    `deadline_misses` entry naming the node and the limit it hit, instead of
+    raising, so the graph's usual failure routing applies.
+    """
+    takes_config = "config" in inspect.signature(fn).parameters
+
+    async def run(state: Dict[str, Any], config: Dict[str, Any]) -> Dict[str, Any]:
+        budget, limit = timeout, "node"
+        left = time_left(state, config)
+        if left is not None and (budget is None or left - reserve < budget):
+            budget, limit = max(left - reserve, 0.0), "run"
+
+        call = fn(state, config) if takes_config else fn(state)
+        if budget is None:
+            return await call
+        if budget <= 0:
+            call.close()
+            return _missed(node, 0.0, limit, on_timeout)
+        try:
+            return await asyncio.wait_for(call, budget)
+        except asyncio.TimeoutError:
+            return _missed(node, budget, limit, on_timeout)
+
+    run.__name__ = getattr(fn, "__name__", node)
+    return run
+
+
+def _missed(
+    node: str,
+    budget: float,
+    limit: str,
+    on_timeout: Callable[[str, str], Dict[str, Any]]
+) -> Dict[str, Any]:
+    budget = round(budget, 1)
+    if limit == "run":
+        msg = f"{node} cancelled: run deadline reached ({budget:g}s left)"
+    else:
+        msg = f"{node} exceeded its {budget:g}s deadline"
+    logger.error(msg)
+    return {
+        **on_timeout(node, msg),
+        "deadline_misses": [{"node": node, "limit": limit, "budget_s": budget}]
+    }
@@ -1,9 +1,10 @@
 from datetime import datetime
 import json
-import os
 import asyncio
 import logging
-from typing import Dict, Union, Optional
+from typing import Any, Dict, Union, Optional
+
+from agents.artifacts import get_artifact_store
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, 
@@ -112,20 +113,7 @@ class ProductInput:
 
             await self.save_to_json()
 
-            response = {
-                "product_name": self.product_name,
-                "units_per_shipment": self.units_per_shipment,
-                "dimensions": self.dimensions,
-                "packaging_location": self.packaging_location,
-                "budget_constraint": self.budget_constraint,
-                "analysis_weights": self.analysis_weights,
-                "metadata": {
-                    "timestamp": self.timestamp,
-                    "user": self.user,
-                    "volume": self.calculate_volume(),
-                    "status": "success"
-                }
-            }
+            response = self.to_input_data()
 
             logger.info(f"Successfully collected details for product: {self.product_name}")
             return response
@@ -137,6 +125,85 @@ class ProductInput:
             logger.error(f"Failed to get product details: {str(e)}", exc_info=True)
             raise
 
+    def load_row(self, row: Dict[str, Any]) -> None:
+        """
+        Populate the details from a batch row (CSV or JSONL record).
+
+        Dimensions and weights may be given as nested objects (`dimensions`,
+        `analysis_weights`, JSON-encoded in CSV) or as flat columns
+        (`length`/`width`/`height`, `<dimension>_weight`). Empty cells fall
+        back to the defaults; a row without any weights uses the default
+        proportions scaled to sum to 1.0.
+
+        Raises:
+            ValueError: If a numeric field cannot be parsed, `units_per_shipment`
+                is not a whole number, or a nested field is not an object.
+        """
+        row = {k.strip(): v for k, v in row.items() if k and v not in (None, "")}
+
+        def nested(key: str) -> Dict[str, Any]:
+            value = row.get(key) or {}
+            if isinstance(value, str):
+                try:
+                    value = json.loads(value)
+                except json.JSONDecodeError:
+                    raise ValueError(f"Invalid value for {key}: {value!r}")
+            if not isinstance(value, dict):
+                raise ValueError(f"{key} must be an object, got {value!r}")
+            return value
+
+        def number(value: Any, field: str, cast=float):
+            try:
+                parsed = float(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid value for {field}: {value!r}")
+            # Reject 12.5 units rather than truncating it
+            if cast is int and not parsed.is_integer():
+                raise ValueError(f"{field} must be a whole number, got {value!r}")
+            return cast(parsed)
+
+        self.product_name = str(row.get("product_name", "")).strip()
+        self.units_per_shipment = number(row.get("units_per_shipment", 0), "units_per_shipment", int)
+        dimensions = nested("dimensions")
+        for dim in self.dimensions:
+            self.dimensions[dim] = number(dimensions.get(dim, row.get(dim, 0)), dim)
+        self.packaging_location = str(row.get("packaging_location", "")).strip()
+        self.budget_constraint = number(row.get("budget_constraint", 0), "budget_constraint")
+        weights = nested("analysis_weights")
+        if weights or any(f"{key}_weight" in row for key in self.analysis_weights):
+            self.analysis_weights = {
+                key: number(weights.get(key, row.get(f"{key}_weight", default)), f"{key}_weight")
+                for key, default in self.analysis_weights.items()
+            }
+        else:
+            # No weights in the row: use the default proportions, scaled to sum to 1.0
+            total = sum(self.analysis_weights.values())
+            self.analysis_weights = {key: round(value / total, 4) for key, value in self.analysis_weights.items()}
+
+    async def from_row(self, row: Dict[str, Any]) -> JsonData:
+        """Load and validate a batch row, returning the same payload as `get_product_details`."""
+        self.load_row(row)
+        validation_error = await self.validate_product_details()
+        if validation_error:
+            raise ValueError(validation_error)
+        return self.to_input_data()
+
+    def to_input_data(self) -> JsonData:
+        return {
+            "product_name": self.product_name,
+            "units_per_shipment": self.units_per_shipment,
+            "dimensions": dict(self.dimensions),
+            "packaging_location": self.packaging_location,
+            "budget_constraint": self.budget_constraint,
+            "analysis_weights": dict(self.analysis_weights),
+            "metadata": {
+                "timestamp": self.timestamp,
+                "user": self.user,
+                "volume": self.calculate_volume(),
+                "status": "success"
+            }
+        }
+
     def calculate_volume(self) -> float:
         return (self.dimensions["length"] * 
                 self.dimensions["width"] * 
@@ -180,13 +247,11 @@ class ProductInput:
                 }
             }
 
-            os.makedirs("temp_KB", exist_ok=True)
-            filename = os.path.join("temp_KB", 
-                                    f"{self.product_name.lower().replace(' ', '_')}.json")
-
-            await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: json.dump(data, open(filename, 'w'), indent=4)
+            # to_thread copies the context, so the write lands in the current run's directory
+            filename = await asyncio.to_thread(
+                get_artifact_store().write_json,
+                self.product_name.lower().replace(' ', '_'),
+                data
             )
 
             logger.info(f"Successfully saved product details to {filename}")
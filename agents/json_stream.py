@@ -0,0 +1,98 @@
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from agents.schemas import parse_json
+
+logger = logging.getLogger(__name__)
+
+
+class ArrayItemStream:
+    """
+    Incremental parser for a model reply that is still being generated.
+
+    Fed the reply chunk by chunk, it returns each object of the `key` array
+    (e.g. `top_materials`) as soon as that object's closing brace arrives,
+    without waiting for the rest of the document.  Text before the first
+    brace (prose, a ```json fence) is skipped, and a reply that is a bare
+    array is treated as the array itself.
+    """
+
+    def __init__(self, key: str = "top_materials"):
+        self.key = key
+        self.emitted = 0
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._string: List[str] = []
+        self._candidate_key: Optional[str] = None
+        self._current_key: Optional[str] = None
+        self._array_depth: Optional[int] = None   # depth inside the target array
+        self._array_done = False
+        self._item: Optional[List[str]] = None
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Consume more reply text; returns the array objects completed by it."""
+        completed = []
+        for ch in chunk:
+            if not self._started:
+                if ch not in "{[":
+                    continue
+                self._started = True
+                if ch == "[":
+                    # Bare array reply
+                    self._array_depth = 1
+
+            if self._item is not None:
+                self._item.append(ch)
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._candidate_key = "".join(self._string)
+                elif self._depth == 1:
+                    self._string.append(ch)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string = []
+            elif ch == ":" and self._depth == 1:
+                self._current_key = self._candidate_key
+            elif ch == "," and self._depth == 1:
+                self._current_key = None
+            elif ch in "{[":
+                self._depth += 1
+                if (ch == "[" and self._array_depth is None and not self._array_done
+                        and self._depth == 2 and self._current_key == self.key):
+                    self._array_depth = 2
+                elif ch == "{" and self._array_depth is not None and self._depth == self._array_depth + 1:
+                    self._item = ["{"]
+            elif ch in "}]":
+                if ch == "}" and self._item is not None and self._depth == self._array_depth + 1:
+                    if (item := self._parse_item("".join(self._item))) is not None:
+                        completed.append(item)
+                    self._item = None
+                elif ch == "]" and self._array_depth is not None and self._depth == self._array_depth:
+                    self._array_depth, self._array_done = None, True
+                self._depth -= 1
+        self.emitted += len(completed)
+        return completed
+
+    @staticmethod
+    def _parse_item(text: str) -> Optional[Dict[str, Any]]:
+        try:
+            item = json.loads(text)
+        except json.JSONDecodeError:
+            try:
+                item = parse_json(text)
+            except ValueError:
+                logger.debug(f"Skipping unparseable streamed item: {text[:80]}")
+                return None
+        return item if isinstance(item, dict) else None
@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import threading
+from typing import Dict, List, Any, Optional
+
+from agents.context import aget_content_json
+from agents.offline import is_fake
+
+logger = logging.getLogger(__name__)
+
+# Vector store backing the shared knowledge base
+LANCEDB_URI = "tmp/lancedb"
+LANCEDB_TABLE = "agno_docs"
+
+KNOWLEDGE_URLS = [
+    "https://www.researchgate.net/publication/322808541_Sustainable_Packaging",
+    "https://sustainablepackaging.org/wp-content/uploads/2019/06/Definition-of-Sustainable-Packaging.pdf",
+    "https://s3.amazonaws.com/gb.assets/SPC+DG_1-8-07_FINAL.pdf",
+]
+
+# Web corpora injected into agent context, by name
+CORPORA = {
+    # PackagingMaterialsAgent -> {database_context}
+    "materials_db": [
+        # Existing sources
+        "https://www.ceew.in/sites/default/files/bio-based-packaging-material-manufacturing.pdf",
+        "https://www.researchgate.net/publication/322808541_Sustainable_Packaging",
+        "https://sustainablepackaging.org/wp-content/uploads/2019/06/Definition-of-Sustainable-Packaging.pdf",
+        "https://s3.amazonaws.com/gb.assets/SPC+DG_1-8-07_FINAL.pdf",
+
+        # New additions
+        "https://www.materiom.org/",
+        "https://infoguides.rit.edu/packaging/databases",
+        "https://search.library.wisc.edu/catalog/9914150907202121",
+        "https://www.repository.cam.ac.uk/items/7abbf7a8-c0d0-4169-8f03-c42b29a1ff95",
+        "https://www.nal.usda.gov/research-tools/food-safety-research-projects/sustainable-and-active-packaging-food-product-safety",
+        "https://www.packworld.com/sustainable-packaging/article/13346852/detailrich-sustainable-packaging-product-database-is-an-industry-first",
+    ],
+    # OrchestrationAgent -> {Research_context}
+    "research": [
+        "https://www.fda.gov/food/food-ingredients-packaging",
+        "https://www.epa.gov/facts-and-figures-about-materials-waste-and-recycling/containers-and-packaging-product-specific",
+        "https://extension.uga.edu/publications/detail.html?number=C992&title=understanding-laboratory-wastewater-tests-i-organics-bod-cod-toc-og",
+        "https://businessanalytiq.com/procurementanalytics/index/ldpe-price-index/",
+        "https://www.mckinsey.com/industries/packaging-and-paper/our-insights/sustainability-in-packaging-us-survey-insights",
+    ],
+}
+
+_knowledge_tools = None
+_knowledge_lock = threading.Lock()
+
+_corpora: Dict[str, List[Dict[str, Any]]] = {}
+_corpus_tasks: Dict[str, asyncio.Task] = {}
+
+
+def get_knowledge_tools():
+    """
+    Return the process-wide `KnowledgeTools`, building the URL knowledge base
+    and its LanceDB store on first use.
+    """
+    global _knowledge_tools
+    with _knowledge_lock:
+        if _knowledge_tools is None:
+            from agno.knowledge.url import UrlKnowledge
+            from agno.tools.knowledge import KnowledgeTools
+            from agno.vectordb.lancedb import LanceDb, SearchType
+            from agno.embedder.google import GeminiEmbedder
+
+            logger.info("Initializing shared knowledge base")
+            knowledge = UrlKnowledge(
+                urls=KNOWLEDGE_URLS,
+                vector_db=LanceDb(
+                    uri=LANCEDB_URI,
+                    table_name=LANCEDB_TABLE,
+                    search_type=SearchType.hybrid,
+                    embedder=GeminiEmbedder(),
+                ),
+            )
+            _knowledge_tools = KnowledgeTools(
+                knowledge=knowledge,
+                think=True,
+                search=True,
+                analyze=True,
+                add_few_shot=True,
+            )
+        return _knowledge_tools
+
+
+def knowledge_toolkits() -> List[Any]:
+    """
+    Toolkits giving an agent the shared knowledge base: none under the fake
+    backend, which never calls tools and must not embed documents remotely.
+    """
+    return [] if is_fake() else [get_knowledge_tools()]
+
+
+async def get_corpus(name: str) -> List[Dict[str, Any]]:
+    """
+    Return the fetched pages of a named corpus, fetching it once per process.
+
+    Concurrent callers on the same event loop share a single fetch.
+
+    Args:
+        name: Key into `CORPORA`.
+
+    Returns:
+        A list of dicts as produced by `aget_content_json`.
+    """
+    if name in _corpora:
+        return _corpora[name]
+
+    loop = asyncio.get_running_loop()
+    task = _corpus_tasks.get(name)
+    if task is None or task.get_loop() is not loop:
+        task = loop.create_task(aget_content_json(CORPORA[name]))
+        _corpus_tasks[name] = task
+
+    try:
+        data = await asyncio.shield(task)
+    finally:
+        if task.done() and _corpus_tasks.get(name) is task:
+            del _corpus_tasks[name]
+    _corpora[name] = data
+    return data
+
+
+async def warmup(names: Optional[List[str]] = None, knowledge: bool = True) -> None:
+    """
+    Eagerly fetch corpora and build the knowledge base.
+
+    Args:
+        names: Corpora to fetch; all of `CORPORA` when omitted.
+        knowledge: Whether to also build the shared `KnowledgeTools`
+            (never under the fake backend).
+    """
+    jobs = [get_corpus(name) for name in (names or CORPORA)]
+    if knowledge and not is_fake():
+        jobs.append(asyncio.to_thread(get_knowledge_tools))
+    await asyncio.gather(*jobs)
+    logger.info("Knowledge registry warm")
@@ -0,0 +1,245 @@
+import json
+import time
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+from agno.run.response import RunEvent
+
+from agents.json_stream import ArrayItemStream
+from agents.llm_cache import get_response_cache
+from agents.metrics import CACHE_LOOKUPS, LLM_CALLS, LLM_DURATION, LLM_RETRIES, LLM_TOKENS, current_agent_class
+from agents.offline import fake_run, is_fake
+from agents.rate_limit import estimate_tokens, get_rate_limiter
+from agents.resilience import HEDGE_ENABLED, call_with_retries
+from agents.schemas import AnalystSchema, InvalidItem, parse_analysis, validate_item
+from agents.tracing import Span, span, trace_agent_tools
+
+logger = logging.getLogger(__name__)
+
+REASK_ATTEMPTS = 1  # follow-up prompts for entries that failed validation
+
+
+async def run_agent(
+    agent: Any,
+    prompt: str,
+    use_cache: bool = True,
+    stream_to: Optional[Callable[[], Callable[[str], None]]] = None
+) -> str:
+    """
+    Send a prompt through an agno `Agent` and return the response text.
+
+    Every agent goes through this call so responses can be served from the
+    shared response cache instead of re-paying the model call, and so model
+    and search-tool requests share the process-wide rate limiter.  Transient
+    failures are retried with backoff (see `agents.resilience`).  Under the
+    fake backend (`agents.offline`) the prompt is answered locally instead,
+    uncached and without rate limits.  Each call is an `arun` span (see
+    `agents.tracing`) with a child span per attempt and per tool call,
+    carrying token counts and cache hits.
+
+    Args:
+        agent: The agno `Agent` to run.
+        prompt: Fully rendered prompt.
+        use_cache: Whether to read from and write to the response cache.
+        stream_to: Stream the response; called at the start of each attempt,
+            it returns the sink that attempt's text deltas are passed to.
+            A cache hit is returned without streaming.
+
+    Returns:
+        The raw response content.
+    """
+    model_id = getattr(getattr(agent, "model", None), "id", "") or model_provider(agent)
+    agent_class = current_agent_class()
+    started, outcome = time.perf_counter(), "error"
+    try:
+        with span("arun", "llm", agent=agent_class, model=model_id, prompt_chars=len(prompt),
+                  stream=stream_to is not None) as current:
+            text = await _run_agent(agent, prompt, use_cache, stream_to, current)
+        outcome = "cache_hit" if current.attributes.get("cache_hit") else "ok"
+        return text
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    finally:
+        LLM_CALLS.inc(agent=agent_class, outcome=outcome)
+        if outcome != "cache_hit":
+            LLM_DURATION.observe(time.perf_counter() - started, agent=agent_class)
+
+
+async def _run_agent(
+    agent: Any,
+    prompt: str,
+    use_cache: bool,
+    stream_to: Optional[Callable[[], Callable[[str], None]]],
+    current: Span
+) -> str:
+    fake = is_fake()
+    cache = get_response_cache() if use_cache and not fake else None
+    key = cache.key_for(agent, prompt) if cache else None
+    if cache:
+        cached = cache.get(key)
+        current.set(cache_hit=cached is not None)
+        CACHE_LOOKUPS.inc(cache="response", result="hit" if cached is not None else "miss")
+        if cached is not None:
+            logger.info(f"Response cache hit ({key[:12]})")
+            return cached
+
+    limiter = get_rate_limiter()
+    limiter.limit_agent_tools(agent)
+    trace_agent_tools(agent)
+    provider = "fake" if fake else model_provider(agent)
+    estimate = estimate_tokens(prompt)
+    attempts = 0
+
+    async def attempt(target: Any) -> Any:
+        nonlocal attempts
+        attempts += 1
+        with span(f"attempt {attempts}", "llm_attempt") as attempt_span:
+            attempt_span.set(queued_s=round(await limiter.acquire(provider, estimate), 6))
+            if fake:
+                target = fake_run()
+            if stream_to is None:
+                response = await target.arun(prompt)
+            else:
+                sink = stream_to()
+                async for chunk in await target.arun(prompt, stream=True):
+                    if chunk.event == RunEvent.run_response and isinstance(chunk.content, str):
+                        sink(chunk.content)
+                response = target.run_response
+            # One arun may make several model requests (tool-call rounds); charge them all
+            used = (response.metrics or {}).get("total_tokens") or []
+            limiter.settle(provider, tokens=sum(used) - estimate if used else 0, requests=max(len(used) - 1, 0))
+            attempt_span.set(**token_counts(response))
+            return response
+
+    response = await call_with_retries(
+        lambda: attempt(agent),
+        key=current.attributes["model"],
+        # agno keeps per-run state on the Agent, so a hedge runs on its own copy
+        # A hedge would interleave a second stream into the same sink
+        hedge=(lambda: attempt(agent.deep_copy())) if HEDGE_ENABLED and stream_to is None else None
+    )
+    counts = token_counts(response)
+    current.set(attempts=attempts, **counts)
+    agent_class = current.attributes["agent"]
+    LLM_TOKENS.inc(counts["prompt_tokens"], agent=agent_class, kind="prompt")
+    LLM_TOKENS.inc(counts["response_tokens"], agent=agent_class, kind="response")
+    if attempts > 1:
+        LLM_RETRIES.inc(attempts - 1, agent=agent_class)
+    text = response.content or ""
+    if cache and text.strip():
+        cache.put(key, text, getattr(getattr(agent, "model", None), "id", "") or "")
+    return text
+
+
+def token_counts(response: Any) -> Dict[str, int]:
+    """Prompt, response and total tokens over every model request of an agno run."""
+    metrics = getattr(response, "metrics", None) or {}
+    return {
+        "prompt_tokens": sum(metrics.get("input_tokens") or []),
+        "response_tokens": sum(metrics.get("output_tokens") or []),
+        "total_tokens": sum(metrics.get("total_tokens") or []),
+        "model_requests": len(metrics.get("total_tokens") or []),
+    }
+
+
+def model_provider(agent: Any) -> str:
+    """Rate-limit bucket for an agent's model, e.g. "gemini"."""
+    return type(getattr(agent, "model", None)).__name__.lower()
+
+
+def discard_response(agent: Any, prompt: str) -> None:
+    """Drop a cached response that failed to parse so the next run asks again."""
+    cache = get_response_cache()
+    cache.discard(cache.key_for(agent, prompt))
+
+
+def _reask_prompt(prompt: str, invalid: List[InvalidItem], schema: AnalystSchema) -> str:
+    entries = json.dumps([{"entry": item.raw, "problem": item.reason} for item in invalid], indent=2, default=str)
+    return (
+        f"{prompt}\n\n"
+        f"These entries of your previous answer were invalid:\n{entries}\n\n"
+        f"Return ONLY a JSON object {{\"top_materials\": [...]}} with a corrected version of each of "
+        f"these entries (same materials), where \"{schema.score_field}\" is a number from 0 to "
+        f"{schema.max_score:g}. No other materials and no text outside the JSON."
+    )
+
+
+async def run_analysis(
+    agent: Any,
+    prompt: str,
+    schema: AnalystSchema,
+    reasks: int = REASK_ATTEMPTS,
+    on_material: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    """
+    Run an analyst prompt and return its response as validated JSON.
+
+    The reply is parsed and repaired by `agents.schemas`. Entries of
+    `top_materials` that fail validation are re-asked on their own instead
+    of repeating the whole analysis; any still invalid after `reasks` are
+    dropped.
+
+    With `on_material`, the reply is streamed and each valid material is
+    passed to it as soon as its object is complete, once per material name.
+    Materials that only become valid later (repairs, re-asks, cache hits)
+    are passed on when they do.
+
+    Raises:
+        ValueError: The reply is not usable JSON, even when asked again.
+    """
+    emitted = set()
+
+    def emit(material: Dict[str, Any]) -> None:
+        if on_material is None or material["material_name"] in emitted:
+            return
+        emitted.add(material["material_name"])
+        try:
+            on_material(material)
+        except Exception as e:
+            logger.warning(f"Material listener failed: {e}")
+
+    def stream_to() -> Callable[[str], None]:
+        # Fresh parser per attempt, so a retried stream starts clean
+        parser = ArrayItemStream()
+
+        def sink(text: str) -> None:
+            for raw in parser.feed(text):
+                try:
+                    emit(validate_item(raw, schema).to_dict(schema.score_field))
+                except ValueError:
+                    pass  # re-asked once the full reply is in
+        return sink
+
+    try:
+        parsed = parse_analysis(
+            await run_agent(agent, prompt, stream_to=stream_to if on_material else None), schema
+        )
+    except ValueError as e:
+        discard_response(agent, prompt)
+        logger.warning(f"Unusable analyst response ({e}); asking again")
+        retry = f"{prompt}\n\nYour previous reply could not be used ({e}). Reply with the JSON object only."
+        parsed = parse_analysis(await run_agent(agent, retry, use_cache=False), schema)
+
+    for _ in range(reasks):
+        if not parsed.invalid:
+            break
+        logger.info(f"Re-asking {len(parsed.invalid)} invalid {schema.score_field} entries")
+        try:
+            fixed = parse_analysis(await run_agent(agent, _reask_prompt(prompt, parsed.invalid, schema)), schema)
+        except ValueError as e:
+            logger.warning(f"Re-ask failed: {e}")
+            break
+        parsed.materials.extend(fixed.materials)
+        parsed.invalid = fixed.invalid
+
+    if parsed.invalid:
+        logger.warning(
+            f"Dropping {len(parsed.invalid)} invalid entries: "
+            + "; ".join(item.reason for item in parsed.invalid)
+        )
+    analysis = parsed.to_dict(schema)
+    for material in analysis["top_materials"]:
+        emit(material)
+    return analysis
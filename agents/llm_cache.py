@@ -0,0 +1,163 @@
+import os
+import hashlib
+import sqlite3
+import threading
+import time
+import logging
+from typing import Dict, Optional, Any
+
+from agents.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Cache defaults
+CACHE_PATH = os.path.join("temp_KB", "cache", "llm_cache.sqlite")
+CACHE_TTL = 7 * 24 * 60 * 60   # seconds a response stays valid
+CACHE_MAX_ENTRIES = 2000       # responses kept before LRU eviction
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace and case so trivially different prompts share a key."""
+    return " ".join(prompt.split()).casefold()
+
+
+def toolset_signature(agent: Any) -> str:
+    """Stable description of the tools (and their functions) attached to an agent."""
+    parts = []
+    for tool in getattr(agent, "tools", None) or []:
+        name = getattr(tool, "name", None) or getattr(tool, "__name__", None) or type(tool).__name__
+        functions = sorted(getattr(tool, "functions", {}) or {})
+        parts.append(f"{type(tool).__name__}:{name}:{','.join(functions)}")
+    return "|".join(sorted(parts))
+
+
+class ResponseCache:
+    """
+    Persistent LLM response cache shared by all agents.
+
+    Responses are keyed on model id, normalised prompt and a hash of the
+    agent's tool set, expire after `ttl` seconds and are evicted least
+    recently used first once more than `max_entries` are stored.
+    """
+
+    def __init__(
+        self,
+        path: str = CACHE_PATH,
+        ttl: float = CACHE_TTL,
+        max_entries: int = CACHE_MAX_ENTRIES
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model_id TEXT,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model_id: str, prompt: str, toolset: str = "") -> str:
+        tools_hash = hashlib.sha256(toolset.encode("utf-8")).hexdigest()
+        raw = "\x00".join([model_id or "", normalize_prompt(prompt), tools_hash])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def key_for(self, agent: Any, prompt: str) -> str:
+        """Cache key for sending `prompt` through an agno `Agent`."""
+        model_id = getattr(getattr(agent, "model", None), "id", "") or ""
+        return self.make_key(model_id, prompt, toolset_signature(agent))
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a cached response, or None on a miss or expired entry."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] >= self.ttl:
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, response: str, model_id: str = "") -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model_id, response, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, model_id, response, now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def discard(self, key: str) -> None:
+        """Forget a response, e.g. one that turned out to be unparseable."""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": entries
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """Drop expired entries, then least recently used ones over the limit. Caller holds the lock."""
+        self._conn.execute("DELETE FROM responses WHERE created_at <= ?", (time.time() - self.ttl,))
+        count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY last_access ASC LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Return the process-wide response cache, creating it on first use."""
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache()
+        return _response_cache
+
+
+# Read at scrape time; a cache this process never opened is not reported
+LLM_CACHE_ENTRIES = registry.gauge(
+    "llm_cache_entries", "Responses held in the LLM response cache",
+    collect=lambda: {(): _response_cache.stats()["entries"]} if _response_cache else {})
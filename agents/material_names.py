@@ -0,0 +1,153 @@
+import re
+import unicodedata
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Spelled-out material names -> the abbreviation used as canonical key
+ALIASES = {
+    "polylactic acid": "pla",
+    "poly lactic acid": "pla",
+    "polylactide": "pla",
+    "polyethylene terephthalate": "pet",
+    "recycled polyethylene terephthalate": "rpet",
+    "recycled pet": "rpet",
+    "high density polyethylene": "hdpe",
+    "low density polyethylene": "ldpe",
+    "linear low density polyethylene": "lldpe",
+    "polyethylene": "pe",
+    "polypropylene": "pp",
+    "polystyrene": "ps",
+    "expanded polystyrene": "eps",
+    "polyvinyl chloride": "pvc",
+    "polyhydroxyalkanoate": "pha",
+    "polyhydroxyalkanoates": "pha",
+    "polybutylene succinate": "pbs",
+    "polybutylene adipate terephthalate": "pbat",
+    "thermoplastic starch": "tps",
+    "mushroom": "mycelium",
+    "corrugated cardboard": "corrugated board",
+    "aluminium": "aluminum",
+}
+
+# Format / packaging-form words that don't change which material is meant
+FORM_WORDS = {
+    "film", "films", "sheet", "sheets", "wrap", "wraps", "bag", "bags",
+    "pouch", "pouches", "tray", "trays", "packaging", "material", "materials",
+}
+
+FUZZY_THRESHOLD = 0.5  # minimum token-set Jaccard similarity for a fuzzy match
+
+_ALIAS_PATTERN = re.compile(
+    r"\b(" + "|".join(re.escape(a) for a in sorted(ALIASES, key=len, reverse=True)) + r")\b"
+)
+_PARENTHETICAL = re.compile(r"\(([^)]*)\)")
+
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    return " ".join(re.findall(r"[a-z0-9]+", text.casefold()))
+
+
+def _phrase_key(text: str) -> str:
+    phrase = _ALIAS_PATTERN.sub(lambda m: ALIASES[m.group(1)], _normalize(text))
+    tokens = [t for t in phrase.split() if t not in FORM_WORDS]
+    return " ".join(tokens) or phrase
+
+
+def name_keys(name: str) -> List[str]:
+    """
+    Canonical keys for a material name, most specific first.
+
+    "Polylactic Acid (PLA) film" -> ["pla"]; "Mushroom Packaging (Mycelium)"
+    -> ["mycelium"]; parenthetical qualifiers that differ from the main name
+    yield an extra key.
+    """
+    main = _PARENTHETICAL.sub(" ", name)
+    keys = [_phrase_key(main)]
+    for inner in _PARENTHETICAL.findall(name):
+        key = _phrase_key(inner)
+        if key and key not in keys:
+            keys.append(key)
+    return [k for k in keys if k]
+
+
+def canonical_key(name: str) -> str:
+    keys = name_keys(name)
+    return keys[0] if keys else ""
+
+
+class MaterialNameIndex:
+    """
+    Maps material name variants onto the names registered from the material database.
+
+    Registered names are grouped by canonical key (normalisation plus the alias
+    table), so "PLA", "Polylactic Acid (PLA)" and "PLA film" are one material.
+    Lookups of unregistered spellings fall back to token-set similarity against
+    a precomputed inverted index; results are memoised so repeated joins are a
+    dict hit.
+    """
+
+    def __init__(self, names: Iterable[str] = (), fuzzy_threshold: float = FUZZY_THRESHOLD):
+        self.fuzzy_threshold = fuzzy_threshold
+        self.names: List[str] = []            # first registered spelling per material
+        self._by_key: Dict[str, int] = {}
+        self._tokens: List[Set[str]] = []
+        self._postings: Dict[str, Set[int]] = defaultdict(set)
+        self._memo: Dict[str, Optional[str]] = {}
+        for name in names:
+            self.add(name)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def add(self, name: str) -> str:
+        """Register a database name; returns the canonical name it was grouped under."""
+        keys = name_keys(name)
+        for key in keys:
+            if key in self._by_key:
+                idx = self._by_key[key]
+                break
+        else:
+            idx = len(self.names)
+            self.names.append(name)
+            self._tokens.append(set())
+            self._memo.clear()
+
+        for key in keys:
+            self._by_key.setdefault(key, idx)
+            for token in key.split():
+                self._tokens[idx].add(token)
+                self._postings[token].add(idx)
+        return self.names[idx]
+
+    def lookup(self, name: str) -> Optional[str]:
+        """Canonical name for `name`, or None if it matches no registered material."""
+        if name in self._memo:
+            return self._memo[name]
+
+        keys = name_keys(name)
+        match = next((self.names[self._by_key[k]] for k in keys if k in self._by_key), None)
+        if match is None and keys:
+            match = self._fuzzy(set(" ".join(keys).split()))
+            if match is not None:
+                logger.debug(f"Fuzzy-matched material '{name}' to '{match}'")
+        self._memo[name] = match
+        return match
+
+    def _fuzzy(self, tokens: Set[str]) -> Optional[str]:
+        candidates = set().union(*(self._postings.get(t, ()) for t in tokens)) if tokens else set()
+        best, best_score, tied = None, 0.0, False
+        for idx in candidates:
+            other = self._tokens[idx]
+            score = len(tokens & other) / len(tokens | other)
+            if score > best_score:
+                best, best_score, tied = idx, score, False
+            elif score == best_score:
+                tied = True
+        # An ambiguous best match is worse than none: it would join scores to the wrong material
+        if best is None or tied or best_score < self.fuzzy_threshold:
+            return None
+        return self.names[best]
@@ -0,0 +1,338 @@
+import os
+import math
+import time
+import inspect
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Metrics are opt-in: AGENT_METRICS=1 records them, AGENT_METRICS_PORT also
+# serves them at http://127.0.0.1:<port>/metrics in Prometheus text format
+METRICS_PORT = int(os.getenv("AGENT_METRICS_PORT", "0") or 0)
+METRICS_ENABLED = bool(METRICS_PORT) or os.getenv("AGENT_METRICS", "").lower() in ("1", "true", "yes")
+
+# Histogram buckets in seconds: node and model latencies run from sub-second
+# cache hits to multi-minute tool-heavy calls
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+_agent_class: ContextVar[str] = ContextVar("agent_class", default="unknown")
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[Any], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    """A named metric with fixed label names; updates are no-ops while metrics are disabled."""
+    kind = "untyped"
+
+    def __init__(self, registry: "MetricsRegistry", name: str, help: str, labels: Sequence[str] = ()):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} takes labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(v)}" for key, v in items]
+
+
+class Gauge(Metric):
+    """
+    A value that goes up and down. With `collect`, values are read at scrape
+    time instead: it returns {label values tuple: value}.
+    """
+    kind = "gauge"
+
+    def __init__(self, *args: Any, collect: Optional[Callable[[], Dict[LabelValues, float]]] = None, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+        self.collect = collect
+
+    def set(self, value: float, **labels: Any) -> None:
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels: Any) -> Iterator[None]:
+        """Count the enclosed block as in progress."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def _samples(self) -> List[str]:
+        if self.collect is not None:
+            try:
+                items = sorted(self.collect().items())
+            except Exception as e:
+                logger.warning(f"Could not collect {self.name}: {e}")
+                items = []
+        else:
+            with self._lock:
+                items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(v)}" for key, v in items]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, *args: Any, buckets: Sequence[float] = LATENCY_BUCKETS, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * len(self.buckets))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(counts), self._sums[key]) for key, counts in self._counts.items())
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named counters, gauges and histograms, rendered together in Prometheus text format."""
+
+    def __init__(self, enabled: bool = METRICS_ENABLED):
+        self.enabled = enabled
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls: type, name: str, help: str, labels: Sequence[str], **kwargs: Any) -> Any:
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = cls(self, name, help, labels, **kwargs)
+            return self._metrics[name]
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, help, labels)
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = (), **kwargs: Any) -> Gauge:
+        return self._register(Gauge, name, help, labels, **kwargs)
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (), **kwargs: Any) -> Histogram:
+        return self._register(Histogram, name, help, labels, **kwargs)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+registry = MetricsRegistry()
+
+# Pipeline metrics
+NODE_DURATION = registry.histogram(
+    "pipeline_node_duration_seconds", "Graph node wall time", ("node", "status"))
+NODES_IN_PROGRESS = registry.gauge(
+    "pipeline_nodes_in_progress", "Graph nodes currently running", ("node",))
+LLM_CALLS = registry.counter(
+    "llm_calls_total", "Agent LLM calls by outcome (ok, error, cache_hit)", ("agent", "outcome"))
+LLM_DURATION = registry.histogram(
+    "llm_call_duration_seconds", "Agent LLM call wall time, retries included", ("agent",))
+LLM_RETRIES = registry.counter(
+    "llm_retries_total", "Extra LLM attempts after a failure or hedge", ("agent",))
+LLM_TOKENS = registry.counter(
+    "llm_tokens_total", "Tokens used by agent LLM calls", ("agent", "kind"))
+CACHE_LOOKUPS = registry.counter(
+    "cache_lookups_total", "Response, content and shared-result cache lookups", ("cache", "result"))
+FETCH_DURATION = registry.histogram(
+    "fetch_duration_seconds", "Page fetch wall time", ("outcome",))
+RATE_LIMIT_WAITING = registry.gauge(
+    "rate_limit_waiting", "Calls queued behind a provider rate limit", ("provider",))
+RATE_LIMIT_WAIT = registry.histogram(
+    "rate_limit_wait_seconds", "Time calls queued behind a provider rate limit", ("provider",))
+AGENTS_IN_USE = registry.gauge(
+    "agent_pool_in_use", "Pooled agents checked out", ("agent",))
+
+
+def enable_metrics(enabled: bool = True) -> None:
+    registry.enabled = enabled
+
+
+@contextmanager
+def agent_scope(agent_class: str) -> Iterator[None]:
+    """Attribute LLM calls made in the enclosed block to `agent_class`."""
+    token = _agent_class.set(agent_class)
+    try:
+        yield
+    finally:
+        _agent_class.reset(token)
+
+
+def current_agent_class() -> str:
+    return _agent_class.get()
+
+
+def metered_node(node: str, fn: Callable[..., Awaitable[Dict[str, Any]]]) -> Callable[..., Awaitable[Dict[str, Any]]]:
+    """Wrap a graph node to record its duration and outcome."""
+    takes_config = "config" in inspect.signature(fn).parameters
+
+    async def run(state: Dict[str, Any], config: Dict[str, Any]) -> Dict[str, Any]:
+        started, status = time.perf_counter(), "ok"
+        try:
+            with NODES_IN_PROGRESS.track(node=node):
+                result = await (fn(state, config) if takes_config else fn(state))
+            if isinstance(result, dict) and (
+                result.get("error") or (result.get("dimension_errors") or {}).get(node)
+            ):
+                status = "failed"
+            return result
+        except asyncio.CancelledError:
+            status = "cancelled"
+            raise
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            NODE_DURATION.observe(time.perf_counter() - started, node=node, status=status)
+
+    run.__name__ = getattr(fn, "__name__", node)
+    return run
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug(f"Metrics server: {format % args}")
+
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+
+def serve_metrics(port: Optional[int] = None, host: str = "127.0.0.1") -> Optional[int]:
+    """
+    Enable metrics and serve them at /metrics on `port` (AGENT_METRICS_PORT
+    by default) from a daemon thread, once per process.
+
+    Returns:
+        The port being served, or None when no port is configured.
+    """
+    global _server
+    port = port if port is not None else METRICS_PORT
+    with _server_lock:
+        if _server is None:
+            if not port:
+                return None
+            enable_metrics()
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+            logger.info(f"Serving metrics at http://{host}:{_server.server_address[1]}/metrics")
+        return _server.server_address[1]
+
+
+def write_metrics(path: str) -> None:
+    """Dump the current metrics in Prometheus text format (e.g. for a node-exporter textfile)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(registry.render())
+    os.replace(tmp, path)
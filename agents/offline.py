@@ -0,0 +1,342 @@
+import os
+import re
+import json
+import random
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+from agno.run.response import RunEvent, RunResponse
+
+from agents.schemas import (
+    COST_SCHEMA, CONSUMER_SCHEMA, LOGISTICS_SCHEMA, PROPERTIES_SCHEMA, SUSTAINABILITY_SCHEMA, parse_json
+)
+
+logger = logging.getLogger(__name__)
+
+# Backend selection: "live" calls Gemini and the web; "fake" answers every
+# agent prompt locally and serves fetched URLs from a fixture server
+BACKENDS = ("live", "fake")
+
+# Fake backend latency: "fixed:<s>", "uniform:<min>,<max>" or "lognormal:<median>,<sigma>"
+FAKE_LLM_LATENCY = os.getenv("FAKE_LLM_LATENCY", "fixed:0")
+FAKE_FETCH_LATENCY = os.getenv("FAKE_FETCH_LATENCY", "fixed:0")
+FAKE_STREAM_CHUNK = 64    # characters per streamed chunk
+
+# Candidate pool the fake agents draw from; analysts pick overlapping
+# subsets so ranking, joins and name matching all get exercised
+FAKE_MATERIALS = [
+    "Kraft Paper", "Corrugated Cardboard", "Molded Pulp", "Polylactic Acid (PLA)",
+    "Bagasse", "Glass", "Recycled PET", "Aluminium", "Mushroom Packaging",
+    "Seaweed Film", "Jute", "HDPE", "Cellulose Film", "Cornstarch Foam",
+]
+
+_backend = os.getenv("AGENT_BACKEND", "live").lower()
+_latency_seed = 0
+_latency_calls: Counter = Counter()
+_latency_lock = threading.Lock()
+
+
+def get_backend() -> str:
+    return _backend
+
+
+def set_backend(name: str) -> None:
+    """Switch every agent between the live services and the offline stand-ins."""
+    global _backend
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend {name!r}; expected one of {', '.join(BACKENDS)}")
+    _backend = name
+    logger.info(f"Agent backend: {name}")
+
+
+def is_fake() -> bool:
+    return _backend == "fake"
+
+
+class LatencyModel:
+    """Simulated call latency drawn from a fixed, uniform or lognormal distribution."""
+
+    def __init__(self, spec: str = "fixed:0"):
+        kind, _, args = spec.partition(":")
+        try:
+            params = [float(p) for p in args.split(",") if p.strip()]
+        except ValueError:
+            raise ValueError(f"Invalid latency spec {spec!r}")
+        expected = {"fixed": 1, "uniform": 2, "lognormal": 2}
+        if kind not in expected or len(params) != expected[kind]:
+            raise ValueError(f"Invalid latency spec {spec!r}; use fixed:S, uniform:A,B or lognormal:MEDIAN,SIGMA")
+        self.spec = spec
+        self.kind = kind
+        self.params = params
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            return self.params[0]
+        if self.kind == "uniform":
+            return rng.uniform(*self.params)
+        median, sigma = self.params
+        return median * rng.lognormvariate(0, sigma)
+
+
+def set_latency(llm: Optional[str] = None, fetch: Optional[str] = None, seed: Optional[int] = None) -> None:
+    """
+    Override the fake backend's latency specs (e.g. "lognormal:2,0.5") and
+    the seed their samples are drawn with.
+
+    The fetch latency applies to a fixture server started after the call.
+    """
+    global FAKE_LLM_LATENCY, FAKE_FETCH_LATENCY, _latency_seed
+    if llm is not None:
+        LatencyModel(llm)
+        FAKE_LLM_LATENCY = llm
+    if fetch is not None:
+        LatencyModel(fetch)
+        FAKE_FETCH_LATENCY = fetch
+    if seed is not None:
+        with _latency_lock:
+            _latency_seed = seed
+            _latency_calls.clear()
+
+
+def _rng(*parts: Any) -> random.Random:
+    """Deterministic generator for a prompt, so fake runs are reproducible."""
+    digest = hashlib.sha256("\x00".join(str(p) for p in parts).encode("utf-8")).digest()
+    return random.Random(int.from_bytes(digest[:8], "big"))
+
+
+def _latency_rng(kind: str, key: str) -> random.Random:
+    """
+    Generator for the n-th simulated latency of a prompt or URL, so samples
+    do not depend on the order concurrent calls happen to run in.
+    """
+    with _latency_lock:
+        _latency_calls[(kind, key)] += 1
+        return _rng(kind, _latency_seed, key, _latency_calls[(kind, key)])
+
+
+def _score(rng: random.Random, low: float = 3.0, high: float = 9.5) -> float:
+    return round(rng.uniform(low, high), 1)
+
+
+def _property_fields(rng: random.Random) -> Dict[str, Any]:
+    units = {
+        "mechanical_strength": "MPa", "chemical_resistance": "pH range", "thermal_stability": "°C",
+        "barrier_properties": "g/(m²·day)", "durability": "years",
+    }
+    return {
+        "property_scores": {
+            prop: {"value": str(round(rng.uniform(1, 100), 1)), "unit": unit, "score": _score(rng)}
+            for prop, unit in units.items()
+        },
+        "key_strength": "Good stiffness",
+        "main_limitation": "Moisture sensitive",
+    }
+
+
+def _cost_fields(rng: random.Random) -> Dict[str, Any]:
+    return {
+        "base_price": f"{rng.uniform(0.5, 4):.2f} USD/kg",
+        "key_costs": {c: "moderate" for c in ("raw_material", "processing", "tariffs", "transport", "compliance")},
+        "total_estimated_cost": f"{rng.uniform(0.02, 0.4):.2f} USD",
+    }
+
+
+def _consumer_fields(rng: random.Random) -> Dict[str, Any]:
+    aspects = ("aesthetic_appeal", "usability", "perceived_value", "eco_consciousness", "brand_alignment")
+    return {
+        "consumer_metrics": {
+            a: {"score": _score(rng), "trend_strength": rng.choice(["strong", "moderate", "weak"]),
+                "key_insight": "Steady demand"}
+            for a in aspects
+        },
+        "target_demographics": ["urban millennials", "eco-conscious families"],
+        "market_positioning": "Premium sustainable",
+    }
+
+
+# Prompt marker -> (schema, extra fields for each top_materials entry)
+FAKE_ANALYSTS: List[Tuple[str, Any, Callable[[random.Random], Dict[str, Any]]]] = [
+    ("overall_consumer_score", CONSUMER_SCHEMA, _consumer_fields),
+    ("property_scores", PROPERTIES_SCHEMA, _property_fields),
+    ("environmental_score", SUSTAINABILITY_SCHEMA,
+     lambda rng: {"key_benefit": "Compostable", "primary_concern": "Land use"}),
+    ("logistics_score", LOGISTICS_SCHEMA,
+     lambda rng: {"primary_advantage": "Stackable", "cost_consideration": "Low freight weight"}),
+    ("cost_score", COST_SCHEMA, _cost_fields),
+]
+
+
+def fake_response(prompt: str) -> Dict[str, Any]:
+    """A schema-valid reply to any agent prompt, chosen by the schema the prompt asks for."""
+    rng = _rng(prompt)
+    if "executive_snapshot" in prompt:
+        match = re.search(r'"material_name":\s*"([^"]+)"', prompt)
+        return _fake_summary(match.group(1) if match else "Unknown", rng)
+    for marker, schema, fields in FAKE_ANALYSTS:
+        if marker in prompt:
+            return {
+                "top_materials": [
+                    {"material_name": name, schema.score_field: _score(rng), **fields(rng)}
+                    for name in rng.sample(FAKE_MATERIALS, 5)
+                ],
+                "timestamp": "fake",
+                "user": "fake",
+            }
+    # Analyst prompts embed the material database, so these come after them
+    if "materials_by_criteria" in prompt:
+        return _fake_materials_db(prompt, rng)
+    if "compatibility analysis engine" in prompt:
+        return _fake_compatibility(rng)
+    return {}
+
+
+def _fake_compatibility(rng: random.Random) -> Dict[str, Any]:
+    criteria = (
+        "physical_form", "fragility", "shelf_life", "chemical_properties", "hygiene_sensitivity",
+        "temperature_sensitivity", "volatility_or_hazard_risk", "visibility_and_display",
+        "quantity_and_dosage", "value_and_theft_sensitivity",
+    )
+    return {"criteria": {c: {"explanation": "typical", "concerns": rng.choice(["moisture", "none", "impact"])}
+                         for c in criteria}}
+
+
+def _fake_materials_db(prompt: str, rng: random.Random) -> Dict[str, Any]:
+    try:
+        criteria = list(parse_json(prompt)["materials_by_criteria"])
+    except (ValueError, KeyError, TypeError):
+        criteria = ["general"]
+    return {
+        "materials_by_criteria": {
+            c: [{"material_name": name, "properties": "commercially available"}
+                for name in rng.sample(FAKE_MATERIALS, 4)]
+            for c in criteria
+        }
+    }
+
+
+def _fake_summary(material: str, rng: random.Random) -> Dict[str, Any]:
+    metrics = {
+        m: {"value": "n/a", "score": round(rng.uniform(30, 95))}
+        for m in ("carbon_footprint", "recyclability", "biodegradability", "resource_efficiency", "toxicity")
+    }
+    return {
+        "material_name": material,
+        "executive_snapshot": f"{material} is a reasonable fit (offline stand-in).",
+        "composite_score": {
+            "metrics": metrics,
+            "composite": round(sum(m["score"] for m in metrics.values()) / len(metrics), 1),
+        },
+        "strengths": [{"dimension": "recyclability", "insight": "Widely recycled"}],
+        "trade_offs": [{"dimension": "cost", "mitigation": "Offset by lower freight"}],
+        "supply_chain_implications": {k: "offline" for k in ("costs", "logistics", "regulatory", "consumer")},
+        "consulting_recommendation": {"advice": "Pilot with one product line."},
+        "regulatory_context": "No regulation fetched (offline backend).",
+    }
+
+
+class FakeRun:
+    """
+    One fake `Agent.arun` call: the same interface run_agent uses on a real
+    agent, answering after a simulated latency.
+    """
+
+    def __init__(self, latency: LatencyModel):
+        self.latency = latency
+        self.run_response = None
+
+    def _respond(self, prompt: str) -> Tuple[str, float, Dict[str, Any]]:
+        text = "```json\n" + json.dumps(fake_response(prompt), indent=2) + "\n```"
+        prompt_tokens, response_tokens = len(prompt) // 4, len(text) // 4
+        metrics = {
+            "input_tokens": [prompt_tokens],
+            "output_tokens": [response_tokens],
+            "total_tokens": [prompt_tokens + response_tokens],
+        }
+        return text, self.latency.sample(_latency_rng("latency", prompt)), metrics
+
+    async def arun(self, prompt: str, stream: bool = False):
+        text, delay, metrics = self._respond(prompt)
+        if not stream:
+            await asyncio.sleep(delay)
+            self.run_response = RunResponse(content=text, metrics=metrics)
+            return self.run_response
+        return self._stream(text, delay, metrics)
+
+    async def _stream(self, text: str, delay: float, metrics: Dict[str, Any]) -> AsyncIterator[Any]:
+        chunks = [text[i:i + FAKE_STREAM_CHUNK] for i in range(0, len(text), FAKE_STREAM_CHUNK)]
+        for chunk in chunks:
+            await asyncio.sleep(delay / len(chunks))
+            yield RunResponse(content=chunk, event=RunEvent.run_response)
+        self.run_response = RunResponse(content=text, metrics=metrics)
+
+
+def fake_run() -> FakeRun:
+    return FakeRun(LatencyModel(FAKE_LLM_LATENCY))
+
+
+class _FixtureHandler(BaseHTTPRequestHandler):
+    latency: LatencyModel = LatencyModel()
+
+    def do_GET(self) -> None:
+        time.sleep(self.latency.sample(_latency_rng("fetch", self.path)))
+        rng = _rng(self.path)
+        paragraphs = "".join(
+            f"<p>{name} packaging note {i}: recyclability {rng.randint(10, 95)}%.</p>"
+            for i, name in enumerate(rng.sample(FAKE_MATERIALS, 6))
+        )
+        body = f"<html><head><title>Fixture {self.path}</title></head><body>{paragraphs}</body></html>".encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug(f"Fixture server: {format % args}")
+
+
+class FixtureServer:
+    """Local HTTP server answering every path with a deterministic HTML page."""
+
+    def __init__(self, latency: Optional[LatencyModel] = None):
+        handler = type("FixtureHandler", (_FixtureHandler,), {"latency": latency or LatencyModel(FAKE_FETCH_LATENCY)})
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fixture-server", daemon=True)
+        self._thread.start()
+        logger.info(f"Fixture server listening on {self.base_url}")
+
+    def url_for(self, url: str) -> str:
+        """Fixture URL standing in for an external one (host and path preserved)."""
+        parts = urlsplit(url)
+        return f"{self.base_url}/{quote(parts.netloc)}{quote(parts.path or '/')}"
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+_fixture_server: Optional[FixtureServer] = None
+_fixture_lock = threading.Lock()
+
+
+def get_fixture_server() -> FixtureServer:
+    """Return the process-wide fixture server, starting it on first use."""
+    global _fixture_server
+    with _fixture_lock:
+        if _fixture_server is None:
+            _fixture_server = FixtureServer()
+        return _fixture_server
+
+
+def fetch_target(url: str) -> str:
+    """URL to actually request: the fixture server's stand-in under the fake backend."""
+    return get_fixture_server().url_for(url) if is_fake() else url
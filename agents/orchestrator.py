@@ -1,9 +1,8 @@
 from agno.agent import Agent
 from agno.models.google import Gemini
 from dotenv import load_dotenv
-import json
 import os
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from datetime import datetime
 from agno.tools.tavily import TavilyTools
 from agno.tools.calculator import CalculatorTools
@@ -13,28 +12,19 @@ from agno.tools.googlesearch import GoogleSearchTools
 from agno.tools.pubmed import PubmedTools
 import logging
 from agno.tools.thinking import ThinkingTools
-from agno.tools.knowledge import KnowledgeTools
 import os
 from agno.agent import Agent
-from agno.knowledge.url import UrlKnowledge
-from agno.tools.knowledge import KnowledgeTools
-from agno.vectordb.lancedb import LanceDb, SearchType
-from agno.embedder.google import GeminiEmbedder
 
 
 # Constants
 CURRENT_USER = "codegeek03"
 CURRENT_TIME = "2025-05-09 21:01:46"  # Updated with provided time
 
-urls = [
-    "https://www.fda.gov/food/food-ingredients-packaging",
-    "https://www.epa.gov/facts-and-figures-about-materials-waste-and-recycling/containers-and-packaging-product-specific",
-    "https://extension.uga.edu/publications/detail.html?number=C992&title=understanding-laboratory-wastewater-tests-i-organics-bod-cod-toc-og",
-    "https://businessanalytiq.com/procurementanalytics/index/ldpe-price-index/",
-    "https://www.mckinsey.com/industries/packaging-and-paper/our-insights/sustainability-in-packaging-us-survey-insights",
-]
-
-from agents.context import get_content_json, fetch_url_content
+from agents.artifacts import get_artifact_store
+from agents.knowledge import get_corpus
+from agents.llm import run_agent
+from agents.offline import is_fake
+from agents.schemas import parse_json
 
 
 # Set up logging
@@ -44,26 +34,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-agno_docs = UrlKnowledge(
-    urls=["https://www.researchgate.net/publication/322808541_Sustainable_Packaging","https://sustainablepackaging.org/wp-content/uploads/2019/06/Definition-of-Sustainable-Packaging.pdf",
-          "https://s3.amazonaws.com/gb.assets/SPC+DG_1-8-07_FINAL.pdf","https://sustainablepackaging.org/wp-content/uploads/2019/06/Definition-of-Sustainable-Packaging.pdf"],
-
-    vector_db=LanceDb(
-        uri="tmp/lancedb",
-        table_name="agno_docs",
-        search_type=SearchType.hybrid,
-        embedder=GeminiEmbedder(),
-    ),
-)
-
-knowledge_tools = KnowledgeTools(
-    knowledge=agno_docs,
-    think=True,   
-    search=True,  
-    analyze=True,  
-    add_few_shot=True, 
-)
-
 class OrchestrationAgent:
     def __init__(self, current_time: str = CURRENT_TIME, current_user: str = CURRENT_USER,prop_context: Dict[str, Any] = None):
         logger.info("Initializing OrchestrationAgent")
@@ -73,12 +43,9 @@ class OrchestrationAgent:
 
             load_dotenv()
             self.api_key = os.getenv("GOOGLE_API_KEY")
-            if not self.api_key:
+            if not self.api_key and not is_fake():
                 raise ValueError("GOOGLE_API_KEY environment variable is not set")
 
-            self.reports_dir = "temp_KB/reports"
-            os.makedirs(self.reports_dir, exist_ok=True)
-
 
 
             self.agent = Agent(
@@ -89,7 +56,7 @@ class OrchestrationAgent:
         temperature=0.4  # Lower temperature for more focused responses
     ),
     context={
-        "Research_context": get_content_json(urls), 
+        "Research_context": None,
         "properties": prop_context
     },
     description="You are an expert research analyst with exceptional analytical and investigative abilities.",
@@ -120,6 +87,14 @@ class OrchestrationAgent:
             logger.error(f"Failed to initialize OrchestrationAgent: {str(e)}", exc_info=True)
             raise
 
+    def set_properties_context(self, prop_context: Optional[Dict[str, Any]]) -> None:
+        """Point a (possibly pooled) agent at the current run's properties analysis."""
+        self.agent.context["properties"] = prop_context
+
+    async def _ensure_context(self) -> None:
+        """Attach the shared research corpus, fetching it on first use."""
+        self.agent.context["Research_context"] = await get_corpus("research")
+
     async def generate_executive_summary(
         self,
         product_name: str,
@@ -128,6 +103,7 @@ class OrchestrationAgent:
         material: Dict[str, Any]
     ) -> Dict[str, Any]:
         try:
+            await self._ensure_context()
             mat_name = material["material_name"]
             prompt = f"""
 *You are a senior sustainability consultant advising Blue Yonder’s clients on optimal packaging choices. Use ONLY real, verifiable data from authoritative sources—no hallucinations or made-up figures.  
@@ -211,8 +187,10 @@ Don't embed any URLs in the JSON output they should be openable.
 
             """
 
-            response = await self.agent.arun(prompt)
-            return self._process_response(response.content)
+            # agno keeps per-run state on the Agent, so concurrent summaries
+            # each run on their own copy
+            response_text = await run_agent(self.agent.deep_copy(), prompt, use_cache=False)
+            return self._process_response(response_text)
 
         except Exception as e:
                 logger.error(f"Error generating executive summary: {str(e)}", exc_info=True)
@@ -220,25 +198,15 @@ Don't embed any URLs in the JSON output they should be openable.
 
     def _process_response(self, response_text: str) -> Dict[str, Any]:
         try:
-            response_text = response_text.strip()
-            if response_text.startswith("```json"):
-                response_text = response_text[7:-3].strip()
-            elif response_text.startswith("```"):
-                response_text = response_text[3:-3].strip()
-            return json.loads(response_text)
-        except json.JSONDecodeError as e:
+            return parse_json(response_text)
+        except ValueError as e:
             logger.error(f"Failed to parse response JSON: {str(e)}")
-            raise ValueError(f"Invalid JSON response: {str(e)}")
+            raise
 
     def _save_report(self, data: Dict[str, Any], report_type: str) -> str:
         try:
-            timestamp = self.current_time.replace(" ", "_").replace(":", "-")
-            filename = f"{report_type}_{timestamp}.json"
-            filepath = os.path.join(self.reports_dir, filename)
-
-            with open(filepath, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2)
-
+            # Run-scoped and atomic (see agents.artifacts): concurrent runs keep separate reports
+            filepath = get_artifact_store().write_json(report_type, data)
             logger.info(f"Saved {report_type} report to: {filepath}")
             return filepath
         except Exception as e:
@@ -0,0 +1,190 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, Optional
+
+from agents.metrics import RATE_LIMIT_WAIT, RATE_LIMIT_WAITING
+
+logger = logging.getLogger(__name__)
+
+# Per-provider quotas: requests and model tokens per minute (None = unlimited).
+# Override with RATE_LIMIT_<PROVIDER>_RPM / RATE_LIMIT_<PROVIDER>_TPM.
+PROVIDER_LIMITS = {
+    "gemini": {"rpm": 60, "tpm": 1_000_000},
+    "tavily": {"rpm": 100, "tpm": None},
+    "duckduckgo": {"rpm": 20, "tpm": None},
+    "newspaper": {"rpm": 60, "tpm": None},
+    "googlesearch": {"rpm": 20, "tpm": None},
+    "pubmed": {"rpm": 180, "tpm": None},
+}
+
+# Toolkits that call out to a rate-limited service; local ones (calculator,
+# thinking, knowledge base) are not limited
+TOOLKIT_PROVIDERS = {
+    "TavilyTools": "tavily",
+    "DuckDuckGoTools": "duckduckgo",
+    "Newspaper4kTools": "newspaper",
+    "GoogleSearchTools": "googlesearch",
+    "PubmedTools": "pubmed",
+}
+
+WAIT_SAMPLES = 500  # recent queue waits kept per provider for percentiles
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for budgeting before the provider reports usage."""
+    return max(1, len(text) // 4)
+
+
+class TokenBucket:
+    """
+    Continuously refilling bucket that may go into debt.
+
+    `reserve` always succeeds and returns how long the caller must wait for
+    its share, so waiters are served in arrival order without polling.
+    """
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, amount: float) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= amount
+        return max(0.0, -self.tokens / self.rate)
+
+    def adjust(self, amount: float) -> None:
+        """Charge (positive) or refund (negative) without waiting."""
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class RateLimiter:
+    """
+    Process-wide limiter for model and search-tool calls, one request bucket
+    and one token bucket per provider.
+
+    Buckets are guarded by a thread lock rather than asyncio primitives, so the
+    same limiter serves every event loop (Streamlit runs one per session) and
+    synchronous tool calls executing in worker threads.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Dict[str, Optional[float]]]] = None):
+        self.limits = limits or self._limits_from_env()
+        self._lock = threading.Lock()
+        self._requests: Dict[str, TokenBucket] = {}
+        self._tokens: Dict[str, TokenBucket] = {}
+        for provider, limit in self.limits.items():
+            if limit.get("rpm"):
+                self._requests[provider] = TokenBucket(limit["rpm"])
+            if limit.get("tpm"):
+                self._tokens[provider] = TokenBucket(limit["tpm"])
+        self._calls: Dict[str, int] = defaultdict(int)
+        self._waited: Dict[str, int] = defaultdict(int)
+        self._wait_total: Dict[str, float] = defaultdict(float)
+        self._wait_max: Dict[str, float] = defaultdict(float)
+        self._wait_samples: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=WAIT_SAMPLES))
+
+    @staticmethod
+    def _limits_from_env() -> Dict[str, Dict[str, Optional[float]]]:
+        limits = {}
+        for provider, defaults in PROVIDER_LIMITS.items():
+            limits[provider] = {}
+            for key, default in defaults.items():
+                value = os.getenv(f"RATE_LIMIT_{provider.upper()}_{key.upper()}")
+                limits[provider][key] = float(value) if value else default
+        return limits
+
+    def _reserve(self, provider: str, tokens: int) -> float:
+        with self._lock:
+            delay = 0.0
+            if provider in self._requests:
+                delay = self._requests[provider].reserve(1)
+            if tokens and provider in self._tokens:
+                delay = max(delay, self._tokens[provider].reserve(tokens))
+            self._calls[provider] += 1
+            return delay
+
+    def _record(self, provider: str, delay: float) -> None:
+        RATE_LIMIT_WAIT.observe(delay, provider=provider)
+        with self._lock:
+            self._wait_samples[provider].append(delay)
+            if delay > 0:
+                self._waited[provider] += 1
+                self._wait_total[provider] += delay
+                self._wait_max[provider] = max(self._wait_max[provider], delay)
+        if delay > 1.0:
+            logger.info(f"Rate limit: waited {delay:.1f}s for {provider}")
+
+    async def acquire(self, provider: str, tokens: int = 0) -> float:
+        """Wait for a request slot (and `tokens` of budget) for `provider`; returns the wait."""
+        delay = self._reserve(provider, tokens)
+        if delay > 0:
+            with RATE_LIMIT_WAITING.track(provider=provider):
+                await asyncio.sleep(delay)
+        self._record(provider, delay)
+        return delay
+
+    def acquire_sync(self, provider: str, tokens: int = 0) -> float:
+        """Blocking `acquire` for tool functions, which run in worker threads."""
+        delay = self._reserve(provider, tokens)
+        if delay > 0:
+            with RATE_LIMIT_WAITING.track(provider=provider):
+                time.sleep(delay)
+        self._record(provider, delay)
+        return delay
+
+    def settle(self, provider: str, tokens: int = 0, requests: int = 0) -> None:
+        """Reconcile an estimate with actual usage: extra requests and the token difference."""
+        with self._lock:
+            if requests and provider in self._requests:
+                self._requests[provider].adjust(requests)
+            if tokens and provider in self._tokens:
+                self._tokens[provider].adjust(tokens)
+
+    def limit_toolkit(self, toolkit: Any) -> None:
+        """Route every function of a networked toolkit through the limiter."""
+        provider = TOOLKIT_PROVIDERS.get(type(toolkit).__name__)
+        if provider is None or getattr(toolkit, "_rate_limited", False):
+            return
+        for function in getattr(toolkit, "functions", {}).values():
+            if function.pre_hook is None:
+                function.pre_hook = lambda provider=provider: self.acquire_sync(provider)
+        toolkit._rate_limited = True
+
+    def limit_agent_tools(self, agent: Any) -> None:
+        for tool in getattr(agent, "tools", None) or []:
+            self.limit_toolkit(tool)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            report = {}
+            for provider, calls in self._calls.items():
+                samples = sorted(self._wait_samples[provider])
+                report[provider] = {
+                    "calls": calls,
+                    "waited": self._waited[provider],
+                    "total_wait_s": round(self._wait_total[provider], 2),
+                    "max_wait_s": round(self._wait_max[provider], 2),
+                    "p95_wait_s": round(samples[int(0.95 * (len(samples) - 1))], 2) if samples else 0.0
+                }
+            return report
+
+
+_rate_limiter: Optional[RateLimiter] = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Return the process-wide rate limiter, creating it on first use."""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter()
+        return _rate_limiter
@@ -0,0 +1,141 @@
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+from collections import defaultdict, deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Retry defaults
+RETRY_ATTEMPTS = 3          # attempts per call, including the first
+RETRY_BASE_DELAY = 2.0      # seconds; doubles per attempt before jitter
+RETRY_MAX_DELAY = 30.0      # cap on a single backoff sleep
+ATTEMPT_TIMEOUT = 300.0     # seconds allowed per attempt (tool-heavy runs are slow)
+
+# Hedging: after a call has run longer than the observed latency quantile, a
+# duplicate is started and whichever finishes first wins. Costs an extra call
+# for the slowest few percent, so it is opt-in.
+HEDGE_ENABLED = os.getenv("AGENT_HEDGING", "").lower() in ("1", "true", "yes")
+HEDGE_QUANTILE = 0.95
+HEDGE_MIN_SAMPLES = 20      # latencies observed before hedging kicks in
+LATENCY_SAMPLES = 200       # recent latencies kept per call type
+
+# Status codes worth retrying; any other 4xx is a bad request and will fail again
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+
+
+class LatencyTracker:
+    """Recent successful call latencies per call type, for hedging thresholds."""
+
+    def __init__(self, samples: int = LATENCY_SAMPLES):
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=samples))
+
+    def record(self, key: str, seconds: float) -> None:
+        with self._lock:
+            self._latencies[key].append(seconds)
+
+    def quantile(self, key: str, q: float, min_samples: int = HEDGE_MIN_SAMPLES) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._latencies[key])
+        if len(samples) < min_samples:
+            return None
+        return samples[int(q * (len(samples) - 1))]
+
+
+latency_tracker = LatencyTracker()
+
+
+def backoff_delay(attempt: int, base: float = RETRY_BASE_DELAY, cap: float = RETRY_MAX_DELAY) -> float:
+    """Full-jitter exponential backoff for the given (zero-based) retry."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """
+    Only transient failures are retried: timeouts, connection and transport
+    errors, and RETRYABLE_STATUS responses. Anything else (bad requests,
+    programming errors) would fail the same way again.
+    """
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError, ConnectionError, httpx.TransportError)):
+        return True
+    status = getattr(exc, "status_code", None) or getattr(exc, "code", None)
+    return isinstance(status, int) and status in RETRYABLE_STATUS
+
+
+async def _hedged(
+    primary: Callable[[], Awaitable[T]],
+    hedge: Callable[[], Awaitable[T]],
+    hedge_after: float
+) -> T:
+    """Run `primary`; if it is still running after `hedge_after`s, race it against `hedge`."""
+    tasks = [asyncio.ensure_future(primary())]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+        if done:
+            return tasks[0].result()
+
+        logger.info(f"Call exceeded {hedge_after:.1f}s; starting hedged duplicate")
+        tasks.append(asyncio.ensure_future(hedge()))
+        pending, error = set(tasks), None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        # The loser, or both on timeout/cancellation
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+async def call_with_retries(
+    call: Callable[[], Awaitable[T]],
+    key: str,
+    hedge: Optional[Callable[[], Awaitable[T]]] = None,
+    attempts: int = RETRY_ATTEMPTS,
+    timeout: Optional[float] = ATTEMPT_TIMEOUT
+) -> T:
+    """
+    Await `call()` with per-attempt timeouts and jittered exponential backoff.
+
+    Args:
+        call: Starts one attempt.
+        key: Call type used to track latency (e.g. the model id).
+        hedge: Starts a duplicate attempt on independent state; enables hedging
+            once enough latencies for `key` have been seen.
+        attempts: Total attempts before giving up.
+        timeout: Seconds allowed per attempt, hedge included.
+
+    Raises:
+        The last error once attempts are exhausted or the error is not retryable.
+    """
+    for attempt in range(attempts):
+        started = time.perf_counter()
+        try:
+            hedge_after = latency_tracker.quantile(key, HEDGE_QUANTILE) if hedge else None
+            run = _hedged(call, hedge, hedge_after) if hedge_after is not None else call()
+            result = await asyncio.wait_for(run, timeout) if timeout else await run
+            latency_tracker.record(key, time.perf_counter() - started)
+            return result
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if attempt + 1 >= attempts or not is_retryable(e):
+                raise
+            delay = backoff_delay(attempt)
+            logger.warning(
+                f"{key} attempt {attempt + 1}/{attempts} failed "
+                f"({type(e).__name__}: {e}); retrying in {delay:.1f}s"
+            )
+            await asyncio.sleep(delay)
@@ -0,0 +1,213 @@
+import re
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+FENCE = re.compile(r"```(?:json)?\s*(.*?)(?:```|$)", re.S | re.I)
+SCORE_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+@dataclass(slots=True, frozen=True)
+class AnalystSchema:
+    """What each entry of an analyst's `top_materials` must contain."""
+    score_field: str
+    required: Tuple[str, ...] = ()
+    max_score: float = 10.0
+
+
+# Per-analyst response schemas (see each agent's prompt)
+PROPERTIES_SCHEMA = AnalystSchema("overall_score", ("property_scores",))
+LOGISTICS_SCHEMA = AnalystSchema("logistics_score", ("primary_advantage", "cost_consideration"))
+COST_SCHEMA = AnalystSchema("cost_score", ("base_price", "key_costs"))
+SUSTAINABILITY_SCHEMA = AnalystSchema("environmental_score", ("key_benefit", "primary_concern"))
+CONSUMER_SCHEMA = AnalystSchema("overall_consumer_score", ("consumer_metrics",))
+
+
+@dataclass(slots=True)
+class MaterialScore:
+    material_name: str
+    score: float
+    fields: Dict[str, Any] = field(default_factory=dict)  # the rest of the entry, as returned
+
+    def to_dict(self, score_field: str) -> Dict[str, Any]:
+        return {"material_name": self.material_name, score_field: self.score, **self.fields}
+
+
+@dataclass(slots=True)
+class InvalidItem:
+    index: int
+    raw: Any
+    reason: str
+
+
+@dataclass(slots=True)
+class AnalystResponse:
+    materials: List[MaterialScore]
+    invalid: List[InvalidItem]
+    extra: Dict[str, Any]  # top-level keys other than top_materials
+
+    def to_dict(self, schema: AnalystSchema) -> Dict[str, Any]:
+        return {**self.extra, "top_materials": [m.to_dict(schema.score_field) for m in self.materials]}
+
+
+def extract_json(text: str) -> str:
+    """The JSON part of a model reply: inside a ``` fence if there is one, without surrounding prose."""
+    text = text.strip()
+    if match := FENCE.search(text):
+        text = match.group(1).strip()
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if starts and min(starts) > 0:
+        text = text[min(starts):]
+    end = max(text.rfind("}"), text.rfind("]"))
+    if end != -1 and text[end + 1:].strip():
+        text = text[:end + 1]
+    return text
+
+
+def _last_significant(out: List[str]) -> int:
+    i = len(out) - 1
+    while i >= 0 and out[i].isspace():
+        i -= 1
+    return i
+
+
+def repair_json(text: str) -> str:
+    """
+    Fix the mistakes models commonly make in JSON.
+
+    Drops trailing commas, inserts commas missing between values on separate
+    lines, escapes raw newlines inside strings and closes a truncated reply.
+    """
+    out: List[str] = []
+    stack: List[str] = []
+    in_string = escaped = gap = False
+    for ch in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            elif ch == "\n":
+                ch = "\\n"
+            out.append(ch)
+            continue
+
+        if ch.isspace():
+            gap = True
+            out.append(ch)
+            continue
+
+        last = _last_significant(out)
+        prev = out[last] if last >= 0 else ""
+        if ch in "}]":
+            if prev == ",":
+                del out[last]
+            if stack:
+                stack.pop()
+        elif stack and gap and (ch in '"{[-' or ch.isalnum()) and (prev in '"}]' or prev.isalnum()):
+            # Two values in a row: the model forgot the comma between them
+            out.insert(last + 1, ",")
+
+        if ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch == '"':
+            in_string = True
+        out.append(ch)
+        gap = False
+
+    if in_string:
+        out.append('"')
+    last = _last_significant(out)
+    if last >= 0 and out[last] == ",":
+        del out[last]
+    elif last >= 0 and out[last] == ":":
+        out.append(" null")
+    out.extend(reversed(stack))
+    return "".join(out)
+
+
+def parse_json(text: str) -> Any:
+    """
+    Parse a model reply as JSON, stripping fences and prose and repairing it if needed.
+
+    Raises:
+        ValueError: The reply is not JSON even after repair.
+    """
+    cleaned = extract_json(text)
+    try:
+        return json.loads(cleaned)
+    except json.JSONDecodeError as e:
+        try:
+            parsed = json.loads(repair_json(cleaned))
+        except json.JSONDecodeError:
+            logger.debug(f"Unparseable response text: {text}")
+            raise ValueError(f"Invalid JSON response: {e}") from e
+        logger.info(f"Repaired malformed JSON response ({e})")
+        return parsed
+
+
+def _as_score(value: Any, max_score: float) -> float:
+    if isinstance(value, bool):
+        raise ValueError(f"score is a boolean ({value})")
+    if isinstance(value, str):
+        # "7", "7.5/10", "8 out of 10"
+        match = SCORE_NUMBER.search(value)
+        if not match:
+            raise ValueError(f"score is not a number ({value!r})")
+        value = match.group()
+    try:
+        score = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"score is not a number ({value!r})")
+    if not 0 <= score <= max_score:
+        raise ValueError(f"score {score:g} is outside 0-{max_score:g}")
+    return score
+
+
+def validate_item(raw: Any, schema: AnalystSchema) -> MaterialScore:
+    """
+    Validate one `top_materials` entry.
+
+    Raises:
+        ValueError: With the reason the entry is unusable.
+    """
+    if not isinstance(raw, dict):
+        raise ValueError("entry is not an object")
+    name = raw.get("material_name")
+    if not isinstance(name, str) or not name.strip():
+        raise ValueError("material_name is missing")
+    if schema.score_field not in raw:
+        raise ValueError(f"{schema.score_field} is missing")
+    score = _as_score(raw[schema.score_field], schema.max_score)
+    if missing := [key for key in schema.required if raw.get(key) in (None, "")]:
+        raise ValueError(f"missing {', '.join(missing)}")
+    fields = {k: v for k, v in raw.items() if k not in ("material_name", schema.score_field)}
+    return MaterialScore(name.strip(), score, fields)
+
+
+def parse_analysis(text: str, schema: AnalystSchema) -> AnalystResponse:
+    """
+    Parse an analyst reply into validated materials plus the entries that failed.
+
+    Raises:
+        ValueError: The reply is not JSON or has no `top_materials` list.
+    """
+    data = parse_json(text)
+    if isinstance(data, list):
+        data = {"top_materials": data}
+    if not isinstance(data, dict) or not isinstance(data.get("top_materials"), list):
+        raise ValueError("Response has no top_materials list")
+
+    materials, invalid = [], []
+    for i, raw in enumerate(data["top_materials"]):
+        try:
+            materials.append(validate_item(raw, schema))
+        except ValueError as e:
+            invalid.append(InvalidItem(i, raw, str(e)))
+    extra = {k: v for k, v in data.items() if k != "top_materials"}
+    return AnalystResponse(materials, invalid, extra)
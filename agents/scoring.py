@@ -0,0 +1,220 @@
+import logging
+from typing import Dict, Any, Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from agents.material_names import MaterialNameIndex
+
+logger = logging.getLogger(__name__)
+
+# Weight dimension -> (state key of the analyst output, score field in its top_materials)
+DIMENSION_SOURCES = {
+    "properties": ("properties_analysis", "overall_score"),
+    "logistics": ("logistics_analysis", "logistics_score"),
+    "cost": ("cost_analysis", "cost_score"),
+    "sustainability": ("sustainability_analysis", "environmental_score"),
+    "consumer": ("consumer_analysis", "overall_consumer_score"),
+}
+
+ANALYST_SCALE = 10        # analysts score 0-10, ranking works on 0-100
+STRENGTH_THRESHOLD = 70   # normalized score reported as a strength
+WEAKNESS_THRESHOLD = 30   # normalized score reported as a weakness
+
+
+def _as_score(value: Any, name: str, dim: str) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            logger.warning(f"Invalid score type for {name} in {dim}: {type(value)}")
+            return 0.0
+    return float(value)
+
+
+class ScoreMatrix:
+    """
+    Materials × dimensions score matrix.
+
+    Rows are unique (canonical) material names in first-seen order, columns are scoring
+    dimensions.  The matrix is built once from the analyst outputs; weighting,
+    clipping and ranking are then array operations, so re-ranking with new
+    weights costs the same whether there are ten candidates or thousands.
+    """
+
+    def __init__(self, names: Sequence[str], dimensions: Sequence[str] = tuple(DIMENSION_SOURCES)):
+        self.names = list(names)
+        self.dimensions = list(dimensions)
+        self.rows = {name: i for i, name in enumerate(self.names)}
+        self.columns = {dim: j for j, dim in enumerate(self.dimensions)}
+        self.raw = np.zeros((len(self.names), len(self.dimensions)))
+
+    def fill(
+        self,
+        dim: str,
+        scores: Dict[str, Any],
+        scale: float = 1.0,
+        resolve: Optional[Callable[[str], Optional[str]]] = None
+    ) -> None:
+        """
+        Set column `dim` from a name -> score mapping; unknown names are ignored.
+
+        `resolve` maps a scored name onto a row name (e.g. a canonical-name lookup).
+        """
+        j = self.columns[dim]
+        for name, value in scores.items():
+            i = self.rows.get(resolve(name) if resolve else name)
+            if i is not None:
+                self.raw[i, j] = _as_score(value, name, dim) * scale
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> Tuple["ScoreMatrix", List[Dict[str, Any]], np.ndarray]:
+        """
+        Build the matrix from the material database and analyst outputs in a graph state.
+
+        Database entries are grouped by canonical material name, and analyst
+        scores are joined through the same index, so spelling variants such as
+        "PLA" and "Polylactic Acid (PLA)" land on one row.
+
+        Returns:
+            (matrix, named material entries in database order, row index of each entry)
+        """
+        entries = [
+            material
+            for crit_list in state["material_database"].get("materials", {}).values()
+            for material in crit_list
+            if material.get("material_name")
+        ]
+        index = MaterialNameIndex()
+        canonical = [index.add(m["material_name"]) for m in entries]
+        matrix = cls(index.names)
+        for dim, (state_key, field) in DIMENSION_SOURCES.items():
+            matrix.fill(
+                dim,
+                {m["material_name"]: m[field] for m in (state.get(state_key) or {}).get("top_materials", [])},
+                ANALYST_SCALE,
+                index.lookup
+            )
+        entry_rows = np.fromiter((matrix.rows[name] for name in canonical), dtype=np.intp, count=len(entries))
+        return matrix, entries, entry_rows
+
+    def weight_vector(self, weights: Dict[str, float]) -> np.ndarray:
+        return np.array([weights.get(dim, 0) for dim in self.dimensions], dtype=float)
+
+    def normalized(self) -> np.ndarray:
+        return np.clip(self.raw, 0, 100)
+
+    def totals(self, weights: Dict[str, float]) -> np.ndarray:
+        """Weighted average score per material, rounded to two decimals."""
+        w = self.weight_vector(weights)
+        total_weight = w.sum()
+        if total_weight <= 0:
+            return np.zeros(len(self.names))
+        return np.round(self.normalized() @ w / total_weight, 2)
+
+    @staticmethod
+    def top_k(totals: np.ndarray, k: int) -> np.ndarray:
+        """Row indices of the `k` best totals, best first; ties keep row order."""
+        n = len(totals)
+        k = min(k, n)
+        if k <= 0:
+            return np.empty(0, dtype=np.intp)
+        if k < n:
+            best = np.argpartition(-totals, k - 1)[:k]
+            candidates = np.flatnonzero(totals >= totals[best].min())
+        else:
+            candidates = np.arange(n)
+        order = np.lexsort((candidates, -totals[candidates]))
+        return candidates[order[:k]]
+
+    def breakdown(self, i: int, weights: Dict[str, float], total_weight: Optional[float] = None) -> Dict[str, Any]:
+        """Per-dimension score breakdown with strengths, weaknesses and contributions for row `i`."""
+        w = self.weight_vector(weights)
+        if total_weight is None:
+            total_weight = float(w.sum())
+        normalized = np.clip(self.raw[i], 0, 100)
+        weighted = normalized * w
+        total_score = float(weighted.sum())
+
+        scores = {
+            dim: {
+                "raw": float(self.raw[i, j]),
+                "normalized": round(float(normalized[j]), 2),
+                "weighted": round(float(weighted[j]), 2),
+                "weight": weights[dim]
+            }
+            for j, dim in enumerate(self.dimensions)
+        }
+        impact = {
+            dim: round((weights[dim] / total_weight) * 100, 1) if total_weight > 0 else 0.0
+            for dim in self.dimensions
+        }
+
+        return {
+            "total_score": round(total_score / total_weight, 2) if total_weight > 0 else 0,
+            "scores": scores,
+            "reasoning": {
+                "score_breakdown": scores,
+                "strengths": [
+                    {"dimension": dim, "score": score["normalized"], "impact": impact[dim]}
+                    for dim, score in scores.items()
+                    if score["normalized"] >= STRENGTH_THRESHOLD
+                ],
+                "weaknesses": [
+                    {"dimension": dim, "score": score["normalized"], "impact": impact[dim]}
+                    for dim, score in scores.items()
+                    if score["normalized"] <= WEAKNESS_THRESHOLD
+                ],
+                "contribution_analysis": {
+                    dim: round((score["weighted"] / total_score * 100), 1)
+                    for dim, score in scores.items()
+                } if total_score > 0 else impact
+            }
+        }
+
+
+def renormalize_weights(weights: Dict[str, float], missing: Sequence[str]) -> Dict[str, float]:
+    """
+    Move the weight of `missing` dimensions onto the available ones.
+
+    Available dimensions keep their relative weights and the total weight is
+    unchanged; missing dimensions get 0.
+    """
+    kept = sum(w for dim, w in weights.items() if dim not in missing)
+    if kept <= 0:
+        return {dim: 0.0 for dim in weights}
+    scale = sum(weights.values()) / kept
+    return {dim: 0.0 if dim in missing else round(w * scale, 4) for dim, w in weights.items()}
+
+
+def rank_materials(
+    state: Dict[str, Any],
+    weights: Dict[str, float],
+    top_k: int
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Score and rank every candidate material in `state`.
+
+    Returns:
+        (all scored entries sorted by total score, top `top_k` unique materials)
+    """
+    matrix, entries, entry_rows = ScoreMatrix.from_state(state)
+    totals = matrix.totals(weights)
+    raw = matrix.raw
+
+    def scored(entry: Dict[str, Any], i: int) -> Dict[str, Any]:
+        return {
+            **entry,
+            **{dim: float(raw[i, j]) for j, dim in enumerate(matrix.dimensions)},
+            "total_score": float(totals[i])
+        }
+
+    order = np.argsort(-totals[entry_rows], kind="stable")
+    scored_materials = [scored(entries[e], entry_rows[e]) for e in order]
+
+    # First database entry per canonical material represents it in the ranking
+    first_entry = {}
+    for entry, i in zip(entries, entry_rows):
+        first_entry.setdefault(int(i), entry)
+    top_materials = [scored(first_entry[int(i)], i) for i in matrix.top_k(totals, top_k)]
+
+    return scored_materials, top_materials
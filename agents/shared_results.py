@@ -0,0 +1,98 @@
+import asyncio
+import logging
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from agents.material_names import canonical_key
+from agents.metrics import CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(text: Any) -> str:
+    return " ".join(str(text or "").split()).casefold()
+
+
+def product_group_key(input_data: Dict[str, Any]) -> Tuple[str, str]:
+    """
+    Key under which products share their material candidates and summaries.
+
+    Both depend on the product (its compatibility analysis, and its name in
+    the summary text), so only products with the same `category` and
+    packaging location form one group; without a category each product name
+    is its own group.
+    """
+    return (
+        _normalize(input_data.get("category") or input_data.get("product_name")),
+        _normalize(input_data.get("packaging_location"))
+    )
+
+
+def summary_key(input_data: Dict[str, Any], material_name: str) -> Tuple[str, str, str]:
+    """Key for sharing one material's executive summary within a product group."""
+    return (*product_group_key(input_data), canonical_key(material_name))
+
+
+class _NotShared(Exception):
+    """Raised to waiters when the leader's result is not reusable."""
+
+
+class SharedResults:
+    """
+    Single-flight memo of sub-results shared between graph runs of one batch.
+
+    The first run to ask for a key computes it; concurrent and later runs
+    with the same key reuse that result.  Results rejected by `cacheable`
+    (e.g. error payloads) are not shared: waiters compute their own instead.
+    """
+
+    def __init__(self):
+        self._results: Dict[Tuple[str, Hashable], asyncio.Future] = {}
+        self.hits: Counter = Counter()
+        self.misses: Counter = Counter()
+
+    async def get_or_compute(
+        self,
+        kind: str,
+        key: Hashable,
+        compute: Callable[[], Awaitable[Any]],
+        cacheable: Optional[Callable[[Any], bool]] = None
+    ) -> Any:
+        slot = (kind, key)
+        pending = self._results.get(slot)
+        if pending is not None:
+            try:
+                result = await asyncio.shield(pending)
+                self.hits[kind] += 1
+                CACHE_LOOKUPS.inc(cache=f"shared_{kind}", result="hit")
+                logger.info(f"Reusing shared {kind} result for {key}")
+                return result
+            except _NotShared:
+                pass
+
+        self.misses[kind] += 1
+        CACHE_LOOKUPS.inc(cache=f"shared_{kind}", result="miss")
+        future = asyncio.get_running_loop().create_future()
+        # Nobody may be waiting; mark any exception as retrieved
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._results[slot] = future
+        try:
+            result = await compute()
+        except BaseException:
+            self._discard(slot, future)
+            raise
+
+        if cacheable is not None and not cacheable(result):
+            self._discard(slot, future)
+        else:
+            future.set_result(result)
+        return result
+
+    def _discard(self, slot: Tuple[str, Hashable], future: asyncio.Future) -> None:
+        if self._results.get(slot) is future:
+            del self._results[slot]
+        if not future.done():
+            future.set_exception(_NotShared())
+
+    def stats(self) -> Dict[str, Any]:
+        return {"hits": dict(self.hits), "misses": dict(self.misses)}
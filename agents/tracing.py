@@ -0,0 +1,328 @@
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import inspect
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Tracing is on unless AGENT_TRACING=0; finished spans are appended to
+# TRACE_DIR/<trace id>.jsonl (the graph thread id for node spans, and one
+# trace per process for work outside any run, such as warmup)
+TRACING_ENABLED = os.getenv("AGENT_TRACING", "1").lower() not in ("0", "false", "no")
+TRACE_DIR = os.getenv("AGENT_TRACE_DIR", os.path.join("temp_KB", "traces"))
+MAX_TRACES = 50             # recent traces kept in memory for the UI
+MAX_TRACE_FILES = 200       # exported traces kept on disk; the oldest are deleted
+PROCESS_TRACE_ID = f"process-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+WATERFALL_WIDTH = 50        # characters in a waterfall bar
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+def _new_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+@dataclass(slots=True)
+class Span:
+    """One timed operation: a graph node, an agent call, a tool call or a fetch."""
+    name: str
+    kind: str
+    trace_id: str
+    span_id: str = field(default_factory=_new_id)
+    parent_id: Optional[str] = None
+    start: float = field(default_factory=time.time)
+    duration_s: Optional[float] = None
+    status: str = "ok"
+    error: Optional[str] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    _started: float = field(default_factory=time.perf_counter, repr=False)
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def fail(self, error: Any, status: str = "error") -> None:
+        self.status = status
+        self.error = str(error) or type(error).__name__
+
+    def finish(self) -> None:
+        if self.duration_s is None:
+            self.duration_s = round(time.perf_counter() - self._started, 6)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        del data["_started"]
+        return data
+
+
+class Tracer:
+    """Collects finished spans per trace and appends them to the trace's JSONL file."""
+
+    def __init__(
+        self,
+        trace_dir: Optional[str] = TRACE_DIR,
+        max_traces: int = MAX_TRACES,
+        max_files: int = MAX_TRACE_FILES
+    ):
+        self.trace_dir = trace_dir
+        self.max_traces = max_traces
+        self.max_files = max_files
+        self._traces: "OrderedDict[str, List[Span]]" = OrderedDict()
+        self._open_tools: Dict[int, Tuple[Span, Any]] = {}
+        self._lock = threading.Lock()
+        if trace_dir:
+            os.makedirs(trace_dir, exist_ok=True)
+
+    def record(self, span: Span) -> None:
+        with self._lock:
+            spans = self._traces.setdefault(span.trace_id, [])
+            self._traces.move_to_end(span.trace_id)
+            spans.append(span)
+            while len(self._traces) > self.max_traces:
+                self._traces.popitem(last=False)
+            if self.trace_dir:
+                path = self.trace_path(span.trace_id)
+                try:
+                    new_file = not os.path.exists(path)
+                    with open(path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(span.to_dict(), default=str) + "\n")
+                    if new_file:
+                        self._rotate(keep=path)
+                except OSError as e:
+                    logger.warning(f"Could not export span {span.name}: {e}")
+
+    def _rotate(self, keep: str) -> None:
+        """Delete the oldest exported traces beyond `max_files`. Caller holds the lock."""
+        paths = [
+            os.path.join(self.trace_dir, name) for name in os.listdir(self.trace_dir)
+            if name.endswith(".jsonl")
+        ]
+        if len(paths) <= self.max_files:
+            return
+        try:
+            paths.sort(key=os.path.getmtime)
+            for path in [p for p in paths if p != keep][:len(paths) - self.max_files]:
+                os.remove(path)
+        except FileNotFoundError:
+            pass  # another process rotated first
+
+    def trace_path(self, trace_id: str) -> str:
+        safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in trace_id)
+        return os.path.join(self.trace_dir or ".", f"{safe}.jsonl")
+
+    def spans(self, trace_id: str) -> List[Dict[str, Any]]:
+        """Finished spans of a trace, from memory or its JSONL export."""
+        with self._lock:
+            spans = [span.to_dict() for span in self._traces.get(trace_id, [])]
+        if not spans and self.trace_dir and os.path.exists(self.trace_path(trace_id)):
+            spans = load_spans(self.trace_path(trace_id))
+        return spans
+
+    def open_tool(self, fc: Any, span: Span) -> None:
+        with self._lock:
+            self._open_tools[id(fc)] = (span, fc)
+
+    def close_tool(self, fc: Any) -> Optional[Span]:
+        with self._lock:
+            span, _ = self._open_tools.pop(id(fc), (None, None))
+        return span
+
+    def close_orphans(self, parent_id: str) -> None:
+        """Finish tool spans still open under `parent_id` (agno skips post-hooks on failure)."""
+        with self._lock:
+            orphans = [k for k, (s, _) in self._open_tools.items() if s.parent_id == parent_id]
+            spans = [self._open_tools.pop(k) for k in orphans]
+        for span, fc in spans:
+            span.fail(getattr(fc, "error", None) or "tool call did not complete")
+            span.finish()
+            self.record(span)
+
+
+_tracer: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """Return the process-wide tracer, creating it on first use."""
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = Tracer()
+        return _tracer
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", trace_id: Optional[str] = None, **attributes: Any) -> Iterator[Span]:
+    """
+    Time the enclosed block as a child of the current span.
+
+    Without a current span the span starts the trace named `trace_id`, or
+    joins the process-level trace when started outside any run. An exception marks the span failed (or cancelled) and propagates.
+    """
+    parent = _current_span.get()
+    current = Span(
+        name=name,
+        kind=kind,
+        trace_id=trace_id or (parent.trace_id if parent else PROCESS_TRACE_ID),
+        parent_id=parent.span_id if parent else None,
+        attributes=attributes
+    )
+    token = _current_span.set(current)
+    try:
+        yield current
+    except asyncio.CancelledError as e:
+        current.fail(e or "cancelled", "cancelled")
+        raise
+    except Exception as e:
+        current.fail(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        current.finish()
+        if TRACING_ENABLED:
+            tracer = get_tracer()
+            tracer.close_orphans(current.span_id)
+            tracer.record(current)
+
+
+def traced_node(node: str, fn: Callable[..., Awaitable[Dict[str, Any]]]) -> Callable[..., Awaitable[Dict[str, Any]]]:
+    """Wrap a graph node in a span on the run's trace (its thread id)."""
+    takes_config = "config" in inspect.signature(fn).parameters
+
+    async def run(state: Dict[str, Any], config: Dict[str, Any]) -> Dict[str, Any]:
+        thread_id = ((config or {}).get("configurable") or {}).get("thread_id")
+        with span(node, "node", trace_id=thread_id) as current:
+            result = await (fn(state, config) if takes_config else fn(state))
+            if isinstance(result, dict):
+                error = result.get("error") or (result.get("dimension_errors") or {}).get(node)
+                if error:
+                    current.fail(error, "failed")
+            return result
+
+    run.__name__ = getattr(fn, "__name__", node)
+    return run
+
+
+def _call_hook(hook: Callable, fc: Any) -> None:
+    params = inspect.signature(hook).parameters
+    kwargs = {}
+    if "fc" in params:
+        kwargs["fc"] = fc
+    if "agent" in params:
+        kwargs["agent"] = fc.function._agent
+    hook(**kwargs)
+
+
+def trace_toolkit(toolkit: Any) -> None:
+    """Give every function of an agno toolkit a span per call, keeping existing hooks."""
+    if getattr(toolkit, "_traced", False) or not TRACING_ENABLED:
+        return
+    for function in getattr(toolkit, "functions", {}).values():
+        def pre_hook(fc, previous=function.pre_hook):
+            if previous is not None:
+                _call_hook(previous, fc)
+            # Tools run in a worker thread on a copy of the agent call's context
+            parent = _current_span.get()
+            get_tracer().open_tool(fc, Span(
+                name=fc.function.name,
+                kind="tool",
+                trace_id=parent.trace_id if parent else PROCESS_TRACE_ID,
+                parent_id=parent.span_id if parent else None,
+                attributes={"arguments": fc.arguments}
+            ))
+
+        def post_hook(fc, previous=function.post_hook):
+            tool_span = get_tracer().close_tool(fc)
+            if tool_span is not None:
+                if fc.error:
+                    tool_span.fail(fc.error)
+                tool_span.finish()
+                get_tracer().record(tool_span)
+            if previous is not None:
+                _call_hook(previous, fc)
+
+        function.pre_hook, function.post_hook = pre_hook, post_hook
+    toolkit._traced = True
+
+
+def trace_agent_tools(agent: Any) -> None:
+    for tool in getattr(agent, "tools", None) or []:
+        trace_toolkit(tool)
+
+
+def load_spans(path: str) -> List[Dict[str, Any]]:
+    """Spans from a JSONL trace export."""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def render_waterfall(spans: List[Dict[str, Any]], width: int = WATERFALL_WIDTH) -> str:
+    """
+    Text waterfall of a trace: one row per span, children under their
+    parent, with a bar placed at the span's offset from the trace start.
+    """
+    if not spans:
+        return "(no spans)"
+    origin = min(s["start"] for s in spans)
+    total = max(s["start"] + (s["duration_s"] or 0) for s in spans) - origin or 1e-9
+    ids = {s["span_id"] for s in spans}
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    for s in sorted(spans, key=lambda s: s["start"]):
+        children.setdefault(s["parent_id"] if s["parent_id"] in ids else None, []).append(s)
+
+    lines = [f"{'span':<44}{'ms':>9}  0{' ' * (width - 2)}{total * 1000:.0f}ms"]
+
+    def walk(parent_id: Optional[str], depth: int) -> None:
+        for s in children.get(parent_id, []):
+            offset = int((s["start"] - origin) / total * width)
+            length = max(1, int((s["duration_s"] or 0) / total * width))
+            bar = " " * offset + ("█" if s["status"] == "ok" else "▒") * min(length, width - offset)
+            label = ("  " * depth + f"{s['kind']}:{s['name']}")[:43]
+            notes = []
+            attrs = s.get("attributes") or {}
+            if attrs.get("total_tokens"):
+                notes.append(f"{attrs['total_tokens']} tok")
+            if attrs.get("cache_hit") or attrs.get("cache") in ("fresh", "revalidated"):
+                notes.append("cached")
+            if s["status"] != "ok":
+                notes.append(s["status"])
+            lines.append(f"{label:<44}{(s['duration_s'] or 0) * 1000:>9.1f}  {bar:<{width}} {' '.join(notes)}")
+            walk(s["span_id"], depth + 1)
+
+    walk(None, 0)
+    return "\n".join(lines)
+
+
+def summarize_spans(spans: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Count, total time and tokens per span kind and name, slowest first: the hot spots."""
+    totals: Dict[str, Dict[str, Any]] = {}
+    for s in spans:
+        entry = totals.setdefault(f"{s['kind']}:{s['name']}", {"count": 0, "total_s": 0.0, "tokens": 0})
+        entry["count"] += 1
+        entry["total_s"] = round(entry["total_s"] + (s["duration_s"] or 0), 6)
+        entry["tokens"] += (s.get("attributes") or {}).get("total_tokens") or 0
+    return dict(sorted(totals.items(), key=lambda item: -item[1]["total_s"]))
+
+
+if __name__ == "__main__":
+    # python -m agents.tracing temp_KB/traces/<thread id>.jsonl
+    if len(sys.argv) != 2:
+        sys.exit("usage: python -m agents.tracing <trace.jsonl>")
+    trace = load_spans(sys.argv[1])
+    print(render_waterfall(trace))
+    print()
+    for key, entry in summarize_spans(trace).items():
+        print(f"{key:<44}{entry['count']:>5}{entry['total_s']:>10.3f}s{entry['tokens']:>9} tok")
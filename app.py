@@ -1,5 +1,6 @@
 import streamlit as st
 import asyncio
+import threading
 from datetime import datetime, timezone
 import requests
 import numpy as np
@@ -7,6 +8,11 @@ import pandas as pd
 import altair as alt
 from streamlit_lottie import st_lottie
 import main as orchestrator
+from agents.checkpoints import checkpoint_store_size
+from agents.knowledge import warmup
+from agents.rate_limit import get_rate_limiter
+from agents.tracing import TRACING_ENABLED, get_tracer, render_waterfall, summarize_spans
+from agents.metrics import serve_metrics
 import pandas as pd
 import matplotlib.pyplot as plt
 
@@ -256,6 +262,22 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource
+def start_knowledge_warmup():
+    """Fetch research corpora and build the knowledge base once per server process, off the render path."""
+    thread = threading.Thread(
+        target=lambda: asyncio.run(warmup()),
+        name="knowledge-warmup",
+        daemon=True
+    )
+    thread.start()
+    return thread
+
+@st.cache_resource
+def start_metrics_server():
+    """Serve /metrics once per server process when AGENT_METRICS_PORT is set."""
+    return serve_metrics()
+
 def load_lottieurl(url: str):
     r = requests.get(url)
     if r.status_code != 200:
@@ -712,7 +734,138 @@ def create_single_radar_chart(material: Dict) -> Optional[alt.Chart]:
     return final_chart
 
 
+NODE_LABELS = {
+    "input": "Understanding product requirements",
+    "compatibility": "Analyzing product compatibility",
+    "material_db": "Searching material database",
+    "properties": "Evaluating material properties",
+    "logistics": "Assessing logistics",
+    "costs": "Analyzing sourcing costs",
+    "sustainability": "Calculating environmental impact",
+    "consumer": "Gauging consumer perception",
+    "orchestrator": "Ranking materials and writing summaries",
+    "error_handler": "Handling errors",
+}
+
+def render_partial_result(container, node: str, update: Dict[str, Any]) -> None:
+    """Show a node's output as soon as it finishes, ahead of the final report."""
+    with container:
+        if node == "material_db" and (materials := update.get("material_database", {}).get("materials")):
+            names = {m.get("material_name") for mats in materials.values() for m in mats if m.get("material_name")}
+            st.success(f"Found {len(names)} candidate materials")
+        elif node in orchestrator.ANALYST_OUTPUTS:
+            state_key, score_key = orchestrator.ANALYST_OUTPUTS[node]
+            analysis = update.get(state_key, {})
+            top = analysis.get("top_materials", [])
+            if top:
+                with st.expander(f"✅ {NODE_LABELS[node]}: top {len(top)} materials"):
+                    for m in top:
+                        st.markdown(f"- **{m.get('material_name', 'Unknown')}** — score {m.get(score_key, 'N/A')}/10")
+            elif err := update.get("dimension_errors", {}).get(node) or analysis.get("error"):
+                st.warning(f"{NODE_LABELS[node]} failed: {err}")
+
+def render_streamed_materials(slot, node: str, materials: List[Dict[str, Any]]) -> None:
+    """Live list of an analyst's materials while its response is still streaming."""
+    _, score_key = orchestrator.ANALYST_OUTPUTS[node]
+    with slot.container():
+        st.markdown(f"⏳ **{NODE_LABELS[node]}** — {len(materials)} materials so far")
+        for m in materials:
+            st.markdown(f"- **{m.get('material_name', 'Unknown')}** — score {m.get(score_key, 'N/A')}/10")
+
+async def run_analysis_with_progress(initial_state: Dict[str, Any], thread_id: str) -> Dict[str, Any]:
+    """Run the analysis graph, showing live per-node progress, and return the final state."""
+    progress_container = st.container()
+    
+    with progress_container:
+        st.markdown('<div class="progress-container">', unsafe_allow_html=True)
+        progress_bar = st.progress(0)
+        status_text = st.empty()
+        partial_results = st.container()
+
+        expected_steps = len(NODE_LABELS) - 1  # every node except the error handler
+        running, finished = set(), set()
+        streamed: Dict[str, Dict[str, Any]] = {}  # analyst node -> live slot and materials so far
+        result = {}
+
+        async with orchestrator.open_checkpointer() as checkpointer:
+            graph = orchestrator.create_analysis_graph(checkpointer)
+            async for event in orchestrator.stream_analysis(
+                initial_state,
+                config={"configurable": {"thread_id": thread_id}},
+                graph=graph
+            ):
+                node = event.get("node")
+                if event["event"] == "material":
+                    live = streamed.setdefault(node, {"slot": partial_results.empty(), "materials": []})
+                    live["materials"].append(event["material"])
+                    render_streamed_materials(live["slot"], node, live["materials"])
+                    continue
+                if event["event"] == "node_start":
+                    running.add(node)
+                elif event["event"] == "node_end":
+                    running.discard(node)
+                    finished.add(node)
+                    if node in streamed:
+                        streamed.pop(node)["slot"].empty()
+                    render_partial_result(partial_results, node, event["update"])
+                else:
+                    result = event["result"]
+                    continue
+
+                progress_bar.progress(min(len(finished) / expected_steps, 1.0))
+                active = ", ".join(NODE_LABELS[n] for n in sorted(running)) or "Finishing up"
+                status_text.markdown(f"<h4 style='text-align:center;color:#3b82f6;'>{active}...</h4>", unsafe_allow_html=True)
+
+            await orchestrator.prune_checkpoints(checkpointer, graph)
+
+        st.markdown('</div>', unsafe_allow_html=True)
+
+    # Clear progress indicators
+    progress_container.empty()
+    return result
+
+def render_checkpoint_gauge() -> None:
+    """Sidebar gauge of how much session history the server is holding (sessions run on the SQLite store)."""
+    with st.sidebar.expander("🗄️ Session Storage"):
+        st.metric("On-disk checkpoints", f"{checkpoint_store_size() / 1024 ** 2:.1f} MB")
+
+def render_rate_limit_stats() -> None:
+    """Sidebar view of how long calls queued behind the provider rate limits."""
+    stats = get_rate_limiter().stats()
+    if not stats:
+        return
+    with st.sidebar.expander("⏱️ Rate Limits"):
+        st.dataframe(
+            pd.DataFrame.from_dict(stats, orient="index").rename_axis("provider"),
+            use_container_width=True
+        )
+
+def render_trace(thread_id: str) -> None:
+    """Waterfall of a run's node, agent, tool and fetch spans, with its hot spots."""
+    if not TRACING_ENABLED or not (spans := get_tracer().spans(thread_id)):
+        return
+    with st.expander("🕒 Run Timeline"):
+        st.code(render_waterfall(spans), language=None)
+        st.dataframe(
+            pd.DataFrame.from_dict(summarize_spans(spans), orient="index").rename_axis("span"),
+            use_container_width=True
+        )
+        st.caption(f"Trace export: {get_tracer().trace_path(thread_id)}")
+
+async def resume_session(thread_id: str) -> Dict[str, Any]:
+    """Continue an interrupted session from its last saved checkpoint."""
+    async with orchestrator.open_checkpointer() as checkpointer:
+        return await orchestrator.resume_analysis(
+            thread_id,
+            orchestrator.create_analysis_graph(checkpointer)
+        )
+
 async def main():
+    start_knowledge_warmup()
+    start_metrics_server()
+    render_checkpoint_gauge()
+    render_rate_limit_stats()
+
     # Header with animation
     st.markdown('<h1 class="main-title">📦 Packaging Material Analysis</h1>', unsafe_allow_html=True)
     st.markdown('<p class="subtitle">Discover the perfect sustainable packaging for your product</p>', unsafe_allow_html=True)
@@ -775,7 +928,18 @@ async def main():
 
             st.markdown(f"**Total Weight: {total_weight:.2f}**")
 
+        resume_id = st.text_input(
+            "Resume Session ID (optional)",
+            placeholder="e.g., codegeek03-1746824506",
+            help="Continue an interrupted analysis from its last completed step"
+        )
+
         submitted = st.form_submit_button("🔍 Analyze Materials")
+        rerank = st.form_submit_button(
+            "⚖️ Re-rank with New Weights",
+            disabled="analysis_result" not in st.session_state
+        )
+        resume = st.form_submit_button("⏯️ Resume Session")
 
         if submitted:
                 input_data = {
@@ -792,58 +956,49 @@ async def main():
                     }
                 }
 
-        try:
-            now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
-            thread_id = f"{orchestrator.CURRENT_USER}-{int(datetime.now(timezone.utc).timestamp())}"
-
-            initial_state = {
-                "input_data": input_data,
-                "user_login": input_data["metadata"]["user"],
-                "current_time": now,
-            }
-        
-        except Exception as e:
-            st.error(f"Input Data First: {e}")
-            return
-
-        # Show enhanced progress
-        progress_container = st.container()
-        
-        with progress_container:
-            st.markdown('<div class="progress-container">', unsafe_allow_html=True)
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-            
-            # More detailed steps
-            steps = [
-                "Understanding product requirements...",
-                "Analyzing material compatibility...",
-                "Evaluating environmental factors...",
-                "Checking regional availability in " + packaging_location + "...",
-                "Assessing durability requirements...",
-                "Calculating carbon footprint...",
-                "Analyzing cost efficiency...",
-                "Generating detailed analysis..."
-            ]
-
-            analysis_task = asyncio.create_task(
-                orchestrator.create_analysis_graph().ainvoke(
-                    initial_state,
-                    config={"configurable": {"thread_id": thread_id}}
+        if rerank and "analysis_result" in st.session_state:
+            # Weights only change the arithmetic: reuse the cached analyst outputs
+            previous = st.session_state["analysis_result"]
+            with st.spinner("Re-ranking materials with new weights..."):
+                final_results = await orchestrator.rescore_results(
+                    previous,
+                    analysis_weights,
+                    st.session_state.setdefault("summary_cache", {})
                 )
-            )
-
-            for i, step in enumerate(steps):
-                progress_value = (i + 1) / len(steps)
-                progress_bar.progress(progress_value)
-                status_text.markdown(f"<h4 style='text-align:center;color:#3b82f6;'>{step}</h4>", unsafe_allow_html=True)
-                await asyncio.sleep(0.5)
+            result = {**previous, "final_results": final_results}
+            st.session_state["analysis_result"] = result
+        elif resume and resume_id.strip():
+            try:
+                with st.spinner(f"Resuming session {resume_id.strip()}..."):
+                    result = await resume_session(resume_id.strip())
+            except ValueError as e:
+                st.error(str(e))
+                return
+            render_trace(resume_id.strip())
+            if not (result.get("error") or result.get("final_results", {}).get("error")):
+                st.session_state["analysis_result"] = result
+                st.session_state["summary_cache"] = {}
+        else:
+            try:
+                now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+                thread_id = orchestrator.new_run_id(orchestrator.CURRENT_USER)
 
-            result = await analysis_task
-            st.markdown('</div>', unsafe_allow_html=True)
+                initial_state = {
+                    "input_data": input_data,
+                    "user_login": input_data["metadata"]["user"],
+                    "current_time": now,
+                }
+            
+            except Exception as e:
+                st.error(f"Input Data First: {e}")
+                return
 
-        # Clear progress indicators
-        progress_container.empty()
+            st.caption(f"Session ID: {thread_id} — use it to resume if the analysis is interrupted")
+            result = await run_analysis_with_progress(initial_state, thread_id)
+            render_trace(thread_id)
+            if not (result.get("error") or result.get("final_results", {}).get("error")):
+                st.session_state["analysis_result"] = result
+                st.session_state["summary_cache"] = {}
 
         if err := (result.get("error") or result.get("final_results", {}).get("error")):
             st.error(f"Analysis failed: {err}")
@@ -867,6 +1022,14 @@ async def main():
                 if lottie_success:
                     st_lottie(lottie_success, height=150, key="success_animation")
             
+            if missing := result.get("final_results", {}).get("missing_dimensions"):
+                st.warning(
+                    "Partial result — ranked without: "
+                    + ", ".join(f"**{dim}** ({reason})" for dim, reason in missing.items())
+                    + ". Weights were renormalised over the remaining analyses; "
+                    "resume this session to backfill them."
+                )
+
             # Dashboard layout
             st.markdown("## 📊 Material Sustainability Analysis Results")
             # Streamlit App Layout
@@ -1195,7 +1358,7 @@ if __name__ == "__main__":
     asyncio.run(main())
     add_dark_mode_toggle()  # Add dark mode toggle in sidebar
     now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
-    thread_id = f"{orchestrator.CURRENT_USER}-{int(datetime.now(timezone.utc).timestamp())}"
+    thread_id = orchestrator.new_run_id(orchestrator.CURRENT_USER)
     # Footer
     st.markdown(f"*Session ID: {thread_id} | Generated: {now}*", unsafe_allow_html=True)
     st.markdown("© 2025 Packaging Material Analysis System 🌱")
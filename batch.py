@@ -0,0 +1,246 @@
+from typing import Dict, Any, List, Iterator, Optional
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import time
+
+from agents.artifacts import new_run_id
+from agents.detail_input import ProductInput
+from agents.metrics import enable_metrics, serve_metrics, write_metrics
+from agents.offline import set_backend
+from agents.shared_results import SharedResults, product_group_key
+from agents.rate_limit import get_rate_limiter
+from main import CURRENT_TIME, CURRENT_USER, create_analysis_graph, mark_finished
+
+logger = logging.getLogger(__name__)
+
+# Batch defaults
+BATCH_CONCURRENCY = 4        # graphs running at once
+BATCH_RUNS_PER_MINUTE = 20   # graph starts allowed per minute (0 = unlimited)
+
+
+def read_rows(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield product rows from a CSV (header row required) or JSONL file."""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        if path.lower().endswith((".jsonl", ".ndjson")):
+            for line_no, line in enumerate(f, 1):
+                if line.strip():
+                    try:
+                        row = json.loads(line)
+                    except json.JSONDecodeError as e:
+                        yield {"_error": f"Line {line_no} is not valid JSON: {e}"}
+                        continue
+                    if isinstance(row, dict):
+                        yield row
+                    else:
+                        yield {"_error": f"Line {line_no} is not a JSON object"}
+        else:
+            yield from csv.DictReader(f)
+
+
+class RunBudget:
+    """Spaces graph starts so a batch stays under `runs_per_minute`."""
+
+    def __init__(self, runs_per_minute: float = BATCH_RUNS_PER_MINUTE):
+        self.interval = 60.0 / runs_per_minute if runs_per_minute > 0 else 0.0
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_start - now
+            self._next_start = max(now, self._next_start) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def prepare_row(index: int, row: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate one row; returns its `input_data` or an invalid-row record."""
+    try:
+        if "_error" in row:
+            raise ValueError(row["_error"])
+        input_data = await ProductInput(CURRENT_TIME, CURRENT_USER).from_row(row)
+    except (ValueError, TypeError) as e:
+        logger.warning(f"Row {index} rejected: {e}")
+        return {"row": index, "product_name": row.get("product_name"), "status": "invalid", "error": str(e)}
+    if row.get("category"):
+        input_data["category"] = str(row["category"]).strip()
+    return {"row": index, "input_data": input_data}
+
+
+def plan_batch(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Order valid rows so each product group's first row starts before the rest.
+
+    Rows in a group (same category, or product name, and location) share
+    their material candidates and summaries, so starting one leader per group
+    first lets every follower reuse its results instead of recomputing them.
+    """
+    groups: Dict[Any, List[Dict[str, Any]]] = {}
+    for item in items:
+        groups.setdefault(product_group_key(item["input_data"]), []).append(item)
+    leaders = [members[0] for members in groups.values()]
+    followers = [item for members in groups.values() for item in members[1:]]
+    logger.info(f"Batch plan: {len(items)} products in {len(groups)} shared groups")
+    if len(items) > 1 and not followers:
+        logger.warning(
+            "No two products share a category and location, so nothing is shared between them; "
+            "add a `category` column to group similar products"
+        )
+    return leaders + followers
+
+
+async def run_product(
+    graph,
+    item: Dict[str, Any],
+    batch_id: str,
+    slots: asyncio.Semaphore,
+    budget: RunBudget,
+    shared: Optional[SharedResults] = None,
+    run_deadline: Optional[float] = None
+) -> Dict[str, Any]:
+    """Run one validated product through the analysis graph."""
+    index, input_data = item["row"], item["input_data"]
+    thread_id = f"{batch_id}-{index}"
+    record = {"row": index, "product_name": input_data["product_name"], "thread_id": thread_id}
+    async with slots:
+        await budget.wait()
+        started = time.perf_counter()
+        logger.info(f"Row {index}: analysing {input_data['product_name']}")
+        try:
+            result = await graph.ainvoke(
+                {
+                    "input_data": input_data,
+                    "user_login": CURRENT_USER,
+                    "current_time": CURRENT_TIME
+                },
+                config={"configurable": {"thread_id": thread_id, "shared": shared, "run_deadline": run_deadline}}
+            )
+        except Exception as e:
+            logger.error(f"Row {index} failed: {e}", exc_info=True)
+            return {**record, "status": "failed", "error": str(e),
+                    "duration_s": round(time.perf_counter() - started, 2)}
+        finally:
+            mark_finished(graph, thread_id)
+
+    final_results = result.get("final_results", {})
+    error = result.get("error") or final_results.get("error")
+    return {
+        **record,
+        "status": "failed" if error else "completed",
+        "error": error,
+        "degraded": bool(final_results.get("degraded")),
+        "deadline_misses": result.get("deadline_misses") or [],
+        "duration_s": round(time.perf_counter() - started, 2),
+        "final_results": final_results
+    }
+
+
+async def run_batch(
+    input_path: str,
+    output_path: str,
+    concurrency: int = BATCH_CONCURRENCY,
+    runs_per_minute: float = BATCH_RUNS_PER_MINUTE,
+    share_results: bool = True,
+    run_deadline: Optional[float] = None
+) -> Dict[str, int]:
+    """
+    Analyse every product in `input_path`, appending one JSON line per product
+    to `output_path` as soon as its run finishes.
+
+    Args:
+        share_results: Compute material candidates and executive summaries
+            once per product group and reuse them across the group.
+        run_deadline: End-to-end budget in seconds per product (default
+            `agents.deadlines.RUN_DEADLINE`).
+
+    Returns:
+        Counts of completed, failed and invalid rows.
+    """
+    rows = list(read_rows(input_path))
+    batch_id = new_run_id("batch")
+    logger.info(f"Batch {batch_id}: {len(rows)} products from {input_path}")
+
+    prepared = [await prepare_row(i, row) for i, row in enumerate(rows, 1)]
+    invalid = [item for item in prepared if "input_data" not in item]
+    planned = plan_batch([item for item in prepared if "input_data" in item])
+
+    graph = create_analysis_graph()
+    slots = asyncio.Semaphore(max(1, concurrency))
+    budget = RunBudget(runs_per_minute)
+    shared = SharedResults() if share_results else None
+    counts = {"completed": 0, "failed": 0, "invalid": 0}
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as out:
+        def emit(record: Dict[str, Any]) -> None:
+            counts[record["status"]] += 1
+            out.write(json.dumps(record, default=str) + "\n")
+            out.flush()
+            logger.info(
+                f"Batch progress: {sum(counts.values())}/{len(rows)} "
+                f"(row {record['row']} {record['status']})"
+            )
+
+        for record in invalid:
+            emit(record)
+        # Tasks start in plan order: slots and the start budget are granted first come, first served
+        tasks = [
+            asyncio.create_task(run_product(graph, item, batch_id, slots, budget, shared, run_deadline))
+            for item in planned
+        ]
+        for finished in asyncio.as_completed(tasks):
+            emit(await finished)
+
+    if shared is not None:
+        logger.info(f"Batch {batch_id} shared results: {shared.stats()}")
+    logger.info(f"Batch {batch_id} rate-limit waits: {get_rate_limiter().stats()}")
+    logger.info(f"Batch {batch_id} finished: {counts}")
+    return counts
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Batch packaging analysis over a CSV or JSONL of products")
+    parser.add_argument("input", help="CSV or JSONL file with one product per row")
+    parser.add_argument("-o", "--output", default=os.path.join("temp_KB", "batch_results.jsonl"),
+                        help="JSONL file results are streamed to")
+    parser.add_argument("-c", "--concurrency", type=int, default=BATCH_CONCURRENCY,
+                        help="graphs running at once")
+    parser.add_argument("-r", "--runs-per-minute", type=float, default=BATCH_RUNS_PER_MINUTE,
+                        help="graph starts allowed per minute (0 = unlimited)")
+    parser.add_argument("--no-share", action="store_true",
+                        help="run every product independently instead of sharing results per group")
+    parser.add_argument("--run-deadline", type=float, default=None,
+                        help="seconds allowed per product before stragglers are cancelled")
+    parser.add_argument("--offline", action="store_true",
+                        help="answer with the fake LLM and fixture server instead of Gemini and the web")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="serve Prometheus metrics at http://127.0.0.1:<port>/metrics while the batch runs")
+    parser.add_argument("--metrics-file", default=None,
+                        help="write the final metrics here in Prometheus text format")
+    args = parser.parse_args(argv)
+    if args.offline:
+        set_backend("fake")
+    serve_metrics(args.metrics_port)
+    if args.metrics_file:
+        enable_metrics()
+
+    counts = asyncio.run(run_batch(
+        args.input, args.output, args.concurrency, args.runs_per_minute, share_results=not args.no_share,
+        run_deadline=args.run_deadline
+    ))
+    print(f"Completed: {counts['completed']}  Failed: {counts['failed']}  Invalid: {counts['invalid']}")
+    print(f"Results: {args.output}")
+    if args.metrics_file:
+        write_metrics(args.metrics_file)
+        print(f"Metrics: {args.metrics_file}")
+
+
+if __name__ == "__main__":
+    main()
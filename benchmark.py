@@ -0,0 +1,323 @@
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime, timezone
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from agents.artifacts import new_run_id
+from agents.offline import get_backend, set_backend, set_latency
+from batch import prepare_row, read_rows
+from main import ANALYST_OUTPUTS, PROGRESS_NODES, CURRENT_TIME, CURRENT_USER, create_analysis_graph, stream_analysis
+
+logger = logging.getLogger(__name__)
+
+# Benchmark defaults
+BENCH_RUNS = 8               # measured graph runs
+BENCH_CONCURRENCY = 4        # graphs running at once
+BENCH_WARMUP_RUNS = 1        # unmeasured runs first (corpus fetch, imports, pools)
+BENCH_LLM_LATENCY = "lognormal:0.5,0.4"   # fake model latency per call
+BENCH_TOLERANCE = 0.10       # allowed relative regression against a baseline
+BENCH_MIN_DELTA_S = 0.05     # time changes below this never count (millisecond nodes are noisy)
+
+# Products cycled through when no --input file is given
+BENCH_PRODUCTS = [
+    {"product_name": "Energy Bar", "units_per_shipment": 200, "length": 12, "width": 4, "height": 2,
+     "packaging_location": "Pune", "budget_constraint": 0.3},
+    {"product_name": "Olive Oil", "units_per_shipment": 24, "length": 8, "width": 8, "height": 28,
+     "packaging_location": "Valencia", "budget_constraint": 1.5},
+    {"product_name": "Face Cream", "units_per_shipment": 120, "length": 6, "width": 6, "height": 5,
+     "packaging_location": "Lyon", "budget_constraint": 0.8},
+    {"product_name": "Coffee Beans", "units_per_shipment": 60, "length": 15, "width": 10, "height": 25,
+     "packaging_location": "Medellin", "budget_constraint": 0.6},
+]
+
+# Summary metrics compared against a baseline, and whether higher is better
+GATED_METRICS = {
+    "run_p50_s": False,
+    "run_p95_s": False,
+    "throughput_rpm": True,
+    "peak_rss_mb": False,
+}
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of `values` (0 when empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))]
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process, or None where unsupported."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def peak_overlap(intervals: List[Tuple[float, float]]) -> int:
+    """Most intervals open at the same instant."""
+    edges = sorted([(start, 1) for start, _ in intervals] + [(end, -1) for _, end in intervals])
+    peak = current = 0
+    for _, step in edges:
+        current += step
+        peak = max(peak, current)
+    return peak
+
+
+async def load_products(input_path: Optional[str]) -> List[Dict[str, Any]]:
+    """Validated `input_data` for each benchmark product."""
+    rows = list(read_rows(input_path)) if input_path else BENCH_PRODUCTS
+    prepared = [await prepare_row(i, row) for i, row in enumerate(rows, 1)]
+    products = [item["input_data"] for item in prepared if "input_data" in item]
+    if not products:
+        raise ValueError("No valid benchmark products")
+    return products
+
+
+async def timed_run(graph, run_id: str, input_data: Dict[str, Any], origin: float) -> Dict[str, Any]:
+    """Run one product through the graph, timing every node from its progress events."""
+    config = {"configurable": {"thread_id": run_id}}
+    state = {"input_data": input_data, "user_login": CURRENT_USER, "current_time": CURRENT_TIME}
+    started = time.perf_counter()
+    open_nodes: Dict[str, float] = {}
+    nodes: List[Dict[str, Any]] = []
+    result: Dict[str, Any] = {}
+    error = None
+    try:
+        async for event in stream_analysis(state, config, graph):
+            now = time.perf_counter() - origin
+            if event["event"] == "node_start":
+                open_nodes[event["node"]] = now
+            elif event["event"] == "node_end" and event["node"] in open_nodes:
+                begin = open_nodes.pop(event["node"])
+                nodes.append({"node": event["node"], "start_s": round(begin, 4), "end_s": round(now, 4),
+                              "error": event["error"]})
+            elif event["event"] == "done":
+                result = event["result"]
+    except Exception as e:
+        logger.error(f"Benchmark run {run_id} failed: {e}", exc_info=True)
+        error = str(e)
+
+    final_results = result.get("final_results", {})
+    error = error or result.get("error") or final_results.get("error")
+    return {
+        "run_id": run_id,
+        "product_name": input_data["product_name"],
+        "status": "failed" if error else "completed",
+        "error": error,
+        "degraded": bool(final_results.get("degraded")),
+        "duration_s": round(time.perf_counter() - started, 4),
+        "nodes": nodes,
+    }
+
+
+def summarize(runs: List[Dict[str, Any]], wall_s: float) -> Dict[str, Any]:
+    """Per-node wall times, achieved concurrency, peak RSS and throughput for a set of runs."""
+    completed = [run for run in runs if run["status"] == "completed"]
+    durations = [run["duration_s"] for run in completed]
+    node_spans = [(n["start_s"], n["end_s"]) for run in runs for n in run["nodes"]]
+    run_spans = [(min(n["start_s"] for n in run["nodes"]), max(n["end_s"] for n in run["nodes"]))
+                 for run in runs if run["nodes"]]
+
+    per_node = {}
+    for name in PROGRESS_NODES:
+        times = [n["end_s"] - n["start_s"] for run in runs for n in run["nodes"] if n["node"] == name]
+        if times:
+            per_node[name] = {
+                "count": len(times),
+                "mean_s": round(sum(times) / len(times), 4),
+                "p50_s": round(percentile(times, 0.50), 4),
+                "p95_s": round(percentile(times, 0.95), 4),
+                "max_s": round(max(times), 4),
+                "total_s": round(sum(times), 4),
+            }
+
+    # Parallelism of the analyst fan-out within each run: analyst busy time
+    # over the span from the first analyst start to the last analyst end
+    fanout = []
+    for run in runs:
+        analysts = [(n["start_s"], n["end_s"]) for n in run["nodes"] if n["node"] in ANALYST_OUTPUTS]
+        span = max((end for _, end in analysts), default=0) - min((start for start, _ in analysts), default=0)
+        if span > 0:
+            fanout.append(sum(end - start for start, end in analysts) / span)
+
+    return {
+        "runs": len(runs),
+        "completed": len(completed),
+        "failed": len(runs) - len(completed),
+        "degraded": sum(run["degraded"] for run in runs),
+        "wall_s": round(wall_s, 4),
+        "throughput_rpm": round(60 * len(completed) / wall_s, 2) if wall_s else 0.0,
+        "run_mean_s": round(sum(durations) / len(durations), 4) if durations else 0.0,
+        "run_p50_s": round(percentile(durations, 0.50), 4),
+        "run_p95_s": round(percentile(durations, 0.95), 4),
+        "concurrency": {
+            "peak_runs": peak_overlap(run_spans),
+            "peak_nodes": peak_overlap(node_spans),
+            "mean_nodes": round(sum(end - start for start, end in node_spans) / wall_s, 2) if wall_s else 0.0,
+            "analyst_fanout": round(sum(fanout) / len(fanout), 2) if fanout else 0.0,
+        },
+        "peak_rss_mb": peak_rss_mb(),
+        "nodes": per_node,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = BENCH_TOLERANCE) -> List[Dict[str, Any]]:
+    """
+    Compare a summary with a baseline summary.
+
+    Returns one entry per gated metric (the run-level metrics in
+    `GATED_METRICS` plus each node's p95) with the relative change and
+    whether it regressed by more than `tolerance` (and, for times, by more
+    than BENCH_MIN_DELTA_S).
+    """
+    pairs = [(name, current.get(name), baseline.get(name), higher) for name, higher in GATED_METRICS.items()]
+    for node, stats in current.get("nodes", {}).items():
+        base = baseline.get("nodes", {}).get(node, {})
+        pairs.append((f"nodes.{node}.p95_s", stats["p95_s"], base.get("p95_s"), False))
+
+    results = []
+    for name, value, base, higher_is_better in pairs:
+        if value is None or not base:
+            continue
+        change = (value - base) / base
+        regressed = change < -tolerance if higher_is_better else change > tolerance
+        if name.endswith("_s") and abs(value - base) < BENCH_MIN_DELTA_S:
+            regressed = False
+        results.append({"metric": name, "baseline": base, "current": value,
+                        "change": round(change, 4), "regressed": regressed})
+    return results
+
+
+async def run_benchmark(
+    runs: int = BENCH_RUNS,
+    concurrency: int = BENCH_CONCURRENCY,
+    warmup_runs: int = BENCH_WARMUP_RUNS,
+    input_path: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Run `runs` analyses, `concurrency` at a time, and summarize them.
+
+    Warm-up runs go first, one at a time, and are left out of the results.
+    """
+    products = await load_products(input_path)
+    graph = create_analysis_graph()
+    bench_id = new_run_id("bench")
+
+    for i in range(warmup_runs):
+        await timed_run(graph, f"{bench_id}-warmup-{i}", products[i % len(products)], time.perf_counter())
+
+    slots = asyncio.Semaphore(max(1, concurrency))
+    origin = time.perf_counter()
+
+    async def measured(i: int) -> Dict[str, Any]:
+        async with slots:
+            return await timed_run(graph, f"{bench_id}-{i}", products[i % len(products)], origin)
+
+    results = await asyncio.gather(*(measured(i) for i in range(runs)))
+    wall_s = time.perf_counter() - origin
+
+    return {
+        "benchmark_id": bench_id,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "backend": get_backend(),
+        "settings": {"runs": runs, "concurrency": concurrency, "warmup_runs": warmup_runs,
+                     "input": input_path, "products": len(products)},
+        "summary": summarize(results, wall_s),
+        "runs": results,
+    }
+
+
+def print_summary(report: Dict[str, Any], comparison: Optional[List[Dict[str, Any]]] = None) -> None:
+    summary = report["summary"]
+    concurrency = summary["concurrency"]
+    print(f"\nBenchmark {report['benchmark_id']} ({report['backend']} backend)")
+    print("=" * 60)
+    print(f"Runs: {summary['completed']}/{summary['runs']} completed, {summary['degraded']} degraded "
+          f"in {summary['wall_s']:.2f}s -> {summary['throughput_rpm']:.1f} runs/min")
+    print(f"Run time: mean {summary['run_mean_s']:.2f}s  p50 {summary['run_p50_s']:.2f}s  "
+          f"p95 {summary['run_p95_s']:.2f}s")
+    print(f"Concurrency: peak {concurrency['peak_runs']} runs / {concurrency['peak_nodes']} nodes, "
+          f"mean {concurrency['mean_nodes']} nodes, analyst fan-out {concurrency['analyst_fanout']}x")
+    if summary["peak_rss_mb"] is not None:
+        print(f"Peak RSS: {summary['peak_rss_mb']} MB")
+
+    print(f"\n{'node':<16}{'count':>6}{'mean':>9}{'p50':>9}{'p95':>9}{'max':>9}")
+    for node, stats in summary["nodes"].items():
+        print(f"{node:<16}{stats['count']:>6}{stats['mean_s']:>9.3f}{stats['p50_s']:>9.3f}"
+              f"{stats['p95_s']:>9.3f}{stats['max_s']:>9.3f}")
+
+    if comparison:
+        print("\nAgainst baseline:")
+        for item in comparison:
+            flag = "REGRESSED" if item["regressed"] else "ok"
+            print(f"  {item['metric']:<28}{item['baseline']:>10}{item['current']:>10}"
+                  f"{item['change']:>+9.1%}  {flag}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the analysis graph end to end")
+    parser.add_argument("-n", "--runs", type=int, default=BENCH_RUNS, help="measured graph runs")
+    parser.add_argument("-c", "--concurrency", type=int, default=BENCH_CONCURRENCY,
+                        help="graphs running at once")
+    parser.add_argument("--warmup", type=int, default=BENCH_WARMUP_RUNS,
+                        help="unmeasured runs before the benchmark")
+    parser.add_argument("-i", "--input", default=None,
+                        help="CSV or JSONL of products (as for batch.py); built-in samples when omitted")
+    parser.add_argument("-o", "--output", default=None, help="write the JSON report here")
+    parser.add_argument("--baseline", default=None, help="JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=BENCH_TOLERANCE,
+                        help="relative regression allowed per metric before failing (0.10 = 10%%)")
+    parser.add_argument("--live", action="store_true",
+                        help="call Gemini and the web instead of the simulated backend")
+    parser.add_argument("--llm-latency", default=BENCH_LLM_LATENCY,
+                        help="simulated model latency: fixed:S, uniform:A,B or lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--fetch-latency", default=None, help="simulated page fetch latency (same format)")
+    parser.add_argument("--seed", type=int, default=0, help="seed for simulated latencies")
+    parser.add_argument("-v", "--verbose", action="store_true", help="keep agent logging")
+    args = parser.parse_args(argv)
+
+    if not args.verbose:
+        logging.disable(logging.INFO)
+    if not args.live:
+        set_backend("fake")
+        set_latency(llm=args.llm_latency, fetch=args.fetch_latency, seed=args.seed)
+
+    report = asyncio.run(run_benchmark(args.runs, args.concurrency, args.warmup, args.input))
+
+    comparison = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            comparison = compare(report["summary"], json.load(f)["summary"], args.tolerance)
+        report["baseline"] = {"path": args.baseline, "tolerance": args.tolerance, "metrics": comparison}
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=str)
+    print_summary(report, comparison)
+
+    summary = report["summary"]
+    if summary["completed"] < summary["runs"]:
+        print(f"\n{summary['runs'] - summary['completed']} of {summary['runs']} runs did not complete")
+        return 1
+    if comparison and any(item["regressed"] for item in comparison):
+        print("\nPerformance regression against baseline")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
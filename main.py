@@ -1,15 +1,17 @@
-from typing import Dict, Any, List, Literal, TypedDict, Annotated, Optional, NotRequired, Union
-from datetime import datetime, timezone
+from typing import Dict, Any, List, Literal, TypedDict, Annotated, Optional, NotRequired, Union, AsyncIterator, Tuple
 import logging
 import os
 import json
 import asyncio
+import argparse
 from dotenv import load_dotenv
 
 # LangGraph imports
 from langgraph.graph import StateGraph, START, END
-from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.config import get_stream_writer
 from langgraph.prebuilt import ToolNode
+from langchain_core.runnables import RunnableConfig
 
 # Agno imports
 from agno.agent import Agent
@@ -24,13 +26,71 @@ from agents.Logistics_Analyst import LogisticCompatibilityAgent
 from agents.Sourcing_Cost_Analyser import ProductionCostAgent
 from agents.Sustainability_Analyst import EnvironmentalImpactAgent
 from agents.Consumer_Behaviour_Analyst import ConsumerBehaviorAgent
-from agents.Orchestrator import OrchestrationAgent
+from agents.orchestrator import OrchestrationAgent
 from agents.context import get_content_json, fetch_url_content
+from agents.agent_pool import agent_pool
+from agents.scoring import DIMENSION_SOURCES, ScoreMatrix, rank_materials, renormalize_weights
+from agents.material_names import MaterialNameIndex
+from agents.shared_results import SharedResults, product_group_key, summary_key
+from agents.checkpoints import open_checkpointer, get_memory_saver, mark_finished, prune_checkpoints
+from agents.deadlines import ORCHESTRATION_RESERVE, run_deadline_at, with_deadline
+from agents.tracing import TRACING_ENABLED, get_tracer, traced_node
+from agents.metrics import metered_node, serve_metrics
+from agents.artifacts import new_run_id, run_scope, run_scoped
 
 # Constants
 CURRENT_USER = "codegeek03"
 CURRENT_TIME = "2025-05-09 21:01:46"  # Updated with provided time
 
+# Graph nodes reported to progress listeners, in pipeline order
+PROGRESS_NODES = [
+    "input", "compatibility", "material_db",
+    "properties", "logistics", "costs", "sustainability", "consumer",
+    "orchestrator", "error_handler"
+]
+
+# Analyst node -> (state key holding its output, per-material score field)
+ANALYST_OUTPUTS = {
+    "properties": ("properties_analysis", "overall_score"),
+    "logistics": ("logistics_analysis", "logistics_score"),
+    "costs": ("cost_analysis", "cost_score"),
+    "sustainability": ("sustainability_analysis", "environmental_score"),
+    "consumer": ("consumer_analysis", "overall_consumer_score"),
+}
+
+# Default scoring weights per analysis dimension
+DEFAULT_ANALYSIS_WEIGHTS = {
+    "properties": 0.1,
+    "logistics": 0.1,
+    "cost": 0.1,
+    "sustainability": 0.4,
+    "consumer": 0.2
+}
+TOP_K = 5  # materials that get an executive summary
+
+# Per-node deadlines in seconds (None = untimed). The run budget in
+# agents.deadlines caps them further; a node that runs out is cancelled.
+NODE_DEADLINES = {
+    "input": None,             # may be waiting on interactive input
+    "compatibility": 120.0,
+    "material_db": 180.0,
+    "properties": 240.0,
+    "logistics": 240.0,
+    "costs": 240.0,
+    "sustainability": 240.0,
+    "consumer": 240.0,
+    "orchestrator": 420.0,     # two waves of SUMMARY_TIMEOUT plus ranking
+    "error_handler": 120.0,
+}
+
+# Degraded mode: orchestrate with whatever analyst dimensions completed, as
+# long as at least this many did; the rest are flagged in final_results
+MIN_COMPLETED_ANALYSES = 3
+
+# Executive summary fan-out
+SUMMARY_CONCURRENCY = 3    # summaries generated at once
+SUMMARY_TIMEOUT = 180.0    # seconds allowed per summary
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -41,6 +101,11 @@ logger = logging.getLogger(__name__)
 import operator
 from typing import Annotated
 
+def merge_dimension_errors(left: Optional[Dict[str, str]], right: Optional[Dict[str, str]]) -> Dict[str, str]:
+    """Reducer for failed analyst dimensions; a None value clears a recovered one."""
+    merged = {**(left or {}), **(right or {})}
+    return {node: msg for node, msg in merged.items() if msg is not None}
+
 # State definition
 class AnalysisState(TypedDict):
     input_data: Annotated[Dict[str, Any], "input_data"]
@@ -62,13 +127,16 @@ class AnalysisState(TypedDict):
     consumer_status: Annotated[str, "consumer_status"]
     orchestration_status: Annotated[str, "orchestration_status"]
     error: Annotated[str, operator.add] # This is correctly set to append mode
+    dimension_errors: Annotated[Dict[str, str], merge_dimension_errors]
+    deadline_at: Annotated[float, "deadline_at"]
+    deadline_misses: Annotated[List[Dict[str, Any]], operator.add]
     user_login: Annotated[str, "user_login"]
     current_time: Annotated[str, "current_time"]
     
 
 
 # Node definitions
-async def process_input(state: AnalysisState) -> Dict:
+async def process_input(state: AnalysisState, config: RunnableConfig) -> Dict:
     logger.info("Starting input processing")
     try:
         if not state.get("input_data"):
@@ -79,9 +147,11 @@ async def process_input(state: AnalysisState) -> Dict:
                 "input_data": details,
                 "input_status": "completed",
                 "user_login": CURRENT_USER,
-                "current_time": CURRENT_TIME
+                "current_time": CURRENT_TIME,
+                "deadline_at": run_deadline_at(config)
             }
-        return {}
+        # The run budget starts once the input is in hand
+        return {"deadline_at": run_deadline_at(config)}
     except Exception as e:
         msg = f"Input processing failed: {e}"
         logger.error(msg, exc_info=True)
@@ -94,11 +164,11 @@ async def analyze_product_compatibility(state: AnalysisState) -> Dict:
     logger.info("Starting product compatibility analysis")
     try:
         if state.get("error"): return {}
-        agent = ProductCompatibilityAgent()
-        result = await agent.analyze_product_compatibility(
-            state["input_data"]["product_name"], 
-            state["input_data"]
-        )
+        async with agent_pool.acquire(ProductCompatibilityAgent) as agent:
+            result = await agent.analyze_product_compatibility(
+                state["input_data"]["product_name"], 
+                state["input_data"]
+            )
         return {
             "compatibility_analysis": result,
             "compatibility_status": "completed"
@@ -111,12 +181,30 @@ async def analyze_product_compatibility(state: AnalysisState) -> Dict:
             "compatibility_status": "failed"
         }
 
-async def query_material_database(state: AnalysisState) -> Dict:
+async def query_material_database(state: AnalysisState, config: RunnableConfig) -> Dict:
     logger.info("Starting material database query")
     try:
         if state.get("error"): return {}
-        agent = PackagingMaterialsAgent(CURRENT_USER, CURRENT_TIME)
-        result = await agent.find_materials_by_criteria(state["compatibility_analysis"],state["input_data"])
+
+        async def find_candidates() -> Dict[str, Any]:
+            async with agent_pool.acquire(PackagingMaterialsAgent, CURRENT_USER, CURRENT_TIME) as agent:
+                return await agent.find_candidate_materials(state["compatibility_analysis"])
+
+        # Batch runs share only the candidates between products of the same
+        # group; each run still writes its own report to its run directory
+        shared = config.get("configurable", {}).get("shared")
+        if shared is not None:
+            materials = await shared.get_or_compute(
+                "material_db",
+                product_group_key(state["input_data"]),
+                find_candidates,
+                cacheable=bool
+            )
+            async with agent_pool.acquire(PackagingMaterialsAgent, CURRENT_USER, CURRENT_TIME) as agent:
+                result = agent.materials_result(materials, state["compatibility_analysis"].get("product_name", ""))
+        else:
+            async with agent_pool.acquire(PackagingMaterialsAgent, CURRENT_USER, CURRENT_TIME) as agent:
+                result = await agent.find_materials_by_criteria(state["compatibility_analysis"], state["input_data"])
         if not result.get("materials"):
             raise ValueError("No compatible materials found")
         return {
@@ -131,95 +219,131 @@ async def query_material_database(state: AnalysisState) -> Dict:
             "material_db_status": "failed"
         }
 
+def material_writer(node: str):
+    """
+    Listener that forwards an analyst's materials, as they are parsed, to
+    `custom`-mode graph stream consumers; None outside a graph run.
+    """
+    try:
+        writer = get_stream_writer()
+    except RuntimeError:
+        return None
+    return lambda material: writer({"node": node, "material": material})
+
+def analyst_update(node: str, result: Dict[str, Any]) -> Dict:
+    """State update for a finished analyst; an error payload marks its dimension as failed."""
+    state_key = ANALYST_OUTPUTS[node][0]
+    if result.get("error"):
+        logger.error(f"{node} analysis returned an error: {result['error']}")
+        return {state_key: result, **analyst_failure(node, result["error"])}
+    return {
+        state_key: result,
+        f"{node}_status": "completed",
+        "dimension_errors": {node: None}
+    }
+
+def analyst_failure(node: str, msg: str) -> Dict:
+    """
+    State update for a failed analyst.
+
+    The failure goes to `dimension_errors` rather than `error`, so the other
+    analysts' results still reach orchestration in degraded mode.
+    """
+    return {
+        "dimension_errors": {node: msg},
+        f"{node}_status": "failed"
+    }
+
+def deadline_failure(node: str, msg: str) -> Dict:
+    """State update for a node cancelled by its deadline; analysts degrade, other nodes fail the run."""
+    if node in ANALYST_OUTPUTS:
+        return analyst_failure(node, msg)
+    if node == "error_handler":
+        return {
+            "final_results": {
+                "error": msg,
+                "timestamp": CURRENT_TIME,
+                "user": CURRENT_USER,
+                "status": "critical_failure"
+            }
+        }
+    status_key = "orchestration_status" if node == "orchestrator" else f"{node}_status"
+    return {"error": msg, status_key: "failed"}
+
+def timed_node(node: str, fn):
+    """`fn` traced, metered and run-scoped, under its NODE_DEADLINES entry and the run budget."""
+    reserve = 0.0 if node in ("orchestrator", "error_handler") else ORCHESTRATION_RESERVE
+    instrumented = traced_node(node, metered_node(node, run_scoped(fn)))
+    return with_deadline(node, instrumented, NODE_DEADLINES[node], deadline_failure, reserve)
+
 async def analyze_material_properties(state: AnalysisState) -> Dict:
     logger.info("Starting material properties analysis")
     if state.get("error"): return {}
     try:
-        agent = MaterialPropertiesAgent()
-        result = await agent.analyze_material_properties(state["material_database"])
-        return {
-            "properties_analysis": result,
-            "properties_status": "completed"
-        }
+        async with agent_pool.acquire(MaterialPropertiesAgent) as agent:
+            result = await agent.analyze_material_properties(state["material_database"], material_writer("properties"))
+        return analyst_update("properties", result)
     except Exception as e:
         msg = f"Material properties analysis failed: {e}"
         logger.error(msg, exc_info=True)
-        return {
-            "error": msg,
-            "properties_status": "failed"
-        }
+        return analyst_failure("properties", msg)
 
 async def analyze_logistics(state: AnalysisState) -> Dict:
     logger.info("Starting logistics analysis")
     if state.get("error"): return {}
     try:
-        agent = LogisticCompatibilityAgent()
-        result = await agent.analyze_top_logistics_materials(state["material_database"],state["input_data"])
-        return {
-            "logistics_analysis": result,
-            "logistics_status": "completed"
-        }
+        async with agent_pool.acquire(LogisticCompatibilityAgent) as agent:
+            result = await agent.analyze_top_logistics_materials(state["material_database"],state["input_data"], material_writer("logistics"))
+        return analyst_update("logistics", result)
     except Exception as e:
         msg = f"Logistics analysis failed: {e}"
         logger.error(msg, exc_info=True)
-        return {
-            "error": msg,
-            "logistics_status": "failed"
-        }
+        return analyst_failure("logistics", msg)
 
 async def analyze_costs(state: AnalysisState) -> Dict:
     logger.info("Starting cost analysis")
     if state.get("error"): return {}
     try:
-        agent = ProductionCostAgent()
-        result = await agent.analyze_production_costs(state["material_database"],state["input_data"])
-        return {
-            "cost_analysis": result,
-            "costs_status": "completed"
-        }
+        async with agent_pool.acquire(ProductionCostAgent) as agent:
+            result = await agent.analyze_production_costs(state["material_database"],state["input_data"], material_writer("costs"))
+        return analyst_update("costs", result)
     except Exception as e:
         msg = f"Cost analysis failed: {e}"
         logger.error(msg, exc_info=True)
-        return {
-            "error": msg,
-            "costs_status": "failed"
-        }
+        return analyst_failure("costs", msg)
 
 async def analyze_sustainability(state: AnalysisState) -> Dict:
     logger.info("Starting sustainability analysis")
     if state.get("error"): return {}
     try:
-        agent = EnvironmentalImpactAgent()
-        result = await agent.analyze_environmental_impact(state["material_database"])
-        return {
-            "sustainability_analysis": result,
-            "sustainability_status": "completed"
-        }
+        async with agent_pool.acquire(EnvironmentalImpactAgent) as agent:
+            result = await agent.analyze_environmental_impact(state["material_database"], material_writer("sustainability"))
+        return analyst_update("sustainability", result)
     except Exception as e:
         msg = f"Sustainability analysis failed: {e}"
         logger.error(msg, exc_info=True)
-        return {
-            "error": msg,
-            "sustainability_status": "failed"
-        }
+        return analyst_failure("sustainability", msg)
 
 async def analyze_consumer_behavior(state: AnalysisState) -> Dict:
     logger.info("Starting consumer behavior analysis")
     if state.get("error"): return {}
     try:
-        agent = ConsumerBehaviorAgent()
-        result = await agent.analyze_consumer_behavior(state["material_database"])
-        return {
-            "consumer_analysis": result,
-            "consumer_status": "completed"
-        }
+        async with agent_pool.acquire(ConsumerBehaviorAgent) as agent:
+            result = await agent.analyze_consumer_behavior(state["material_database"], material_writer("consumer"))
+        return analyst_update("consumer", result)
     except Exception as e:
         msg = f"Consumer behavior analysis failed: {e}"
         logger.error(msg, exc_info=True)
-        return {
-            "error": msg,
-            "consumer_status": "failed"
-        }
+        return analyst_failure("consumer", msg)
+
+# Analyst node name -> node function, for backfilling a degraded run
+ANALYST_NODES = {
+    "properties": analyze_material_properties,
+    "logistics": analyze_logistics,
+    "costs": analyze_costs,
+    "sustainability": analyze_sustainability,
+    "consumer": analyze_consumer_behavior,
+}
 
 def calculate_material_scores(
     material: Dict[str, Any],
@@ -228,70 +352,21 @@ def calculate_material_scores(
     total_weight: float
 ) -> Dict[str, Any]:
     """Calculate normalized and weighted scores for a material."""
+    key = None
     try:
         key = material.get("material_name") or material.get("id") or material.get("name")
         if not key:
             raise ValueError("Material missing identifier")
 
-        scores = {}
-        total_score = 0
-        
-        for dim, analysis_scores in analyses.items():
+        for dim in analyses:
             if dim not in weights:
                 logger.warning(f"Missing weight for dimension: {dim}")
-                continue
-                
-            raw_score = analysis_scores.get(key, 0)
-            if not isinstance(raw_score, (int, float)):
-                logger.warning(f"Invalid score type for {key} in {dim}: {type(raw_score)}")
-                raw_score = 0
-                
-            weight = weights[dim]
-            normalized = min(max(raw_score, 0), 100)
-            weighted = normalized * weight
-            
-            scores[dim] = {
-                "raw": raw_score,
-                "normalized": round(normalized, 2),
-                "weighted": round(weighted, 2),
-                "weight": weight
-            }
-            total_score += weighted
 
-        final_score = round(total_score / total_weight, 2) if total_weight > 0 else 0
-        
-        return {
-            "total_score": final_score,
-            "scores": scores,
-            "reasoning": {
-                "score_breakdown": scores,
-                "strengths": [
-                    {
-                        "dimension": dim,
-                        "score": score["normalized"],
-                        "impact": round((score["weight"] / total_weight) * 100, 1)
-                    }
-                    for dim, score in scores.items()
-                    if score["normalized"] >= 70
-                ],
-                "weaknesses": [
-                    {
-                        "dimension": dim,
-                        "score": score["normalized"],
-                        "impact": round((score["weight"] / total_weight) * 100, 1)
-                    }
-                    for dim, score in scores.items()
-                    if score["normalized"] <= 30
-                ],
-                "contribution_analysis": {
-                    dim: round((score["weighted"] / total_score * 100), 1)
-                    for dim, score in scores.items()
-                } if total_score > 0 else {
-                    dim: round((score["weight"] / total_weight * 100), 1)
-                    for dim, score in scores.items()
-                }
-            }
-        }
+        index = MaterialNameIndex([key])
+        matrix = ScoreMatrix([key], [dim for dim in analyses if dim in weights])
+        for dim in matrix.dimensions:
+            matrix.fill(dim, analyses[dim], resolve=index.lookup)
+        return matrix.breakdown(0, weights, total_weight)
         
     except Exception as e:
         logger.error(f"Score calculation failed for material {key}: {str(e)}", exc_info=True)
@@ -305,116 +380,149 @@ def calculate_material_scores(
             }
         }
 
-async def orchestrate_results(state: AnalysisState) -> Dict:
-    """Orchestrate the analysis results and generate final report."""
-    logger.info("Starting results orchestration")
-    try:
-        orchestrator = OrchestrationAgent(CURRENT_TIME, CURRENT_USER, prop_context=state["properties_analysis"])
-
-        ANALYSIS_WEIGHTS = {
-    "properties": state["input_data"].get("properties_weight", 0.1),
-    "logistics": state["input_data"].get("logistics_weight", 0.1),  
-    "cost": state["input_data"].get("cost_weight", 0.1),
-    "sustainability": state["input_data"].get("sustainability_weight", 0.4),
-    "consumer": state["input_data"].get("consumer_weight", 0.2)
-}
+async def generate_material_summaries(
+    orchestrator: OrchestrationAgent,
+    product_name: str,
+    location: str,
+    materials: List[Dict[str, Any]],
+    concurrency: int = SUMMARY_CONCURRENCY,
+    timeout: float = SUMMARY_TIMEOUT,
+    shared: Optional[SharedResults] = None,
+    input_data: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Generate executive summaries for ranked materials concurrently.
+
+    Summaries are returned in the ranking order of `materials`. A summary that
+    fails or exceeds `timeout` is reported as an error entry without
+    affecting the others. With `shared` (batch runs), a material already
+    summarised for another product in the same group as `input_data` is reused.
+    """
+    k = len(materials)
+    slots = asyncio.Semaphore(max(1, concurrency))
+
+    async def summarize(material: Dict[str, Any]) -> Dict[str, Any]:
+        if shared is None:
+            return await generate(material)
+        return await shared.get_or_compute(
+            "summary",
+            summary_key(input_data or {}, material["material_name"]),
+            lambda: generate(material),
+            cacheable=lambda summary: "error" not in summary
+        )
 
-  
-        materials = state["material_database"].get("materials", {})
-        all_materials = []
-        for crit_list in materials.values():
-            all_materials.extend(crit_list)
+    async def generate(material: Dict[str, Any]) -> Dict[str, Any]:
+        async with slots:
+            try:
+                return await asyncio.wait_for(
+                    orchestrator.generate_executive_summary(product_name, k, location, material),
+                    timeout
+                )
+            except asyncio.TimeoutError:
+                logger.error(f"Executive summary for {material['material_name']} timed out after {timeout}s")
+                return {"error": f"Executive summary timed out after {timeout}s"}
+            except Exception as e:
+                logger.error(f"Executive summary for {material['material_name']} failed: {e}", exc_info=True)
+                return {"error": str(e)}
+
+    summaries = await asyncio.gather(*(summarize(m) for m in materials))
+    return [
+        {"material_name": material["material_name"], "summary": summary}
+        for material, summary in zip(materials, summaries)
+    ]
+
+def resolve_analysis_weights(input_data: Dict[str, Any]) -> Dict[str, float]:
+    """Scoring weights from the input's `analysis_weights`, legacy `<dim>_weight` keys, or defaults."""
+    given = input_data.get("analysis_weights") or {}
+    return {
+        dim: given.get(dim, input_data.get(f"{dim}_weight", default))
+        for dim, default in DEFAULT_ANALYSIS_WEIGHTS.items()
+    }
 
-        # Gather analysis scores from agent outputs (structured JSONs)
-        consumer_scores = {
-            m["material_name"]: m["overall_consumer_score"] * 10
-            for m in state["consumer_analysis"].get("top_materials", [])
-        }
-        logistics_scores = {
-            m["material_name"]: m["logistics_score"] * 10
-            for m in state["logistics_analysis"].get("top_materials", [])
-        }
-        properties_scores = {
-            m["material_name"]: m["overall_score"] * 10
-            for m in state["properties_analysis"].get("top_materials", [])
-        }
-        cost_scores = {
-            m["material_name"]: m["cost_score"] * 10
-            for m in state["cost_analysis"].get("top_materials", [])
-        }
-        sustainability_scores = {
-            m["material_name"]: m["environmental_score"] * 10
-            for m in state["sustainability_analysis"].get("top_materials", [])
-        }
+def score_materials(
+    state: Dict[str, Any],
+    weights: Dict[str, float],
+    top_k: int = TOP_K
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Score every candidate material from the analyst outputs in `state`.
+
+    Pure arithmetic over already-computed analyses, so it can be re-run with
+    different weights without touching any agent.
+
+    Returns:
+        (all scored materials sorted by total score, top `top_k` unique materials)
+    """
+    return rank_materials(state, weights, top_k)
+
+def missing_dimensions(state: Dict[str, Any]) -> Dict[str, str]:
+    """Scoring dimensions whose analyst did not complete, with the reason."""
+    errors = state.get("dimension_errors") or {}
+    dimension_of = {state_key: dim for dim, (state_key, _) in DIMENSION_SOURCES.items()}
+    return {
+        dimension_of[state_key]: errors.get(node, f"{node} analysis did not complete")
+        for node, (state_key, _) in ANALYST_OUTPUTS.items()
+        if state.get(f"{node}_status") != "completed"
+    }
 
-        # Calculate scores with weights
-        scored_materials = []
-        for material in all_materials:
-            name = material.get("material_name")
-            if not name:
-                continue
-
-            scores = {
-                "consumer": consumer_scores.get(name, 0),
-                "logistics": logistics_scores.get(name, 0),
-                "properties": properties_scores.get(name, 0),
-                "cost": cost_scores.get(name, 0),
-                "sustainability": sustainability_scores.get(name, 0),
-            }
+def degraded_weights(state: Dict[str, Any], weights: Dict[str, float]) -> Tuple[Dict[str, float], Dict[str, Any]]:
+    """
+    Weights to score with when some analyst dimensions are missing.
+
+    Returns:
+        (weights renormalised over the available dimensions, fields flagging
+        the missing ones for `final_results`)
+    """
+    missing = missing_dimensions(state)
+    if not missing:
+        return weights, {"degraded": False, "missing_dimensions": {}}
+    logger.warning(f"Degraded result: scoring without {', '.join(missing)}")
+    return renormalize_weights(weights, missing), {
+        "degraded": True,
+        "missing_dimensions": missing,
+        "requested_weights": weights
+    }
+
+async def orchestrate_results(state: AnalysisState, config: Optional[RunnableConfig] = None) -> Dict:
+    """Orchestrate the analysis results and generate final report."""
+    logger.info("Starting results orchestration")
+    try:
+        ANALYSIS_WEIGHTS, coverage = degraded_weights(state, resolve_analysis_weights(state["input_data"]))
+        scored_materials, top_materials = score_materials(state, ANALYSIS_WEIGHTS)
 
-            total_score = sum(
-                (scores[cat] * ANALYSIS_WEIGHTS[cat]) for cat in scores
-            ) / sum(ANALYSIS_WEIGHTS.values())
-
-            scored_materials.append({
-                **material,
-                **scores,
-                "total_score": round(total_score, 2)
-            })
-
-        # Sort and select top materials
-        scored_materials.sort(key=lambda x: x["total_score"], reverse=True)
-        seen = set()
-        top_materials = []
-        for m in scored_materials:
-            if m["material_name"] not in seen :
-                top_materials.append(m)
-                seen.add(m["material_name"])
-            if len(top_materials) == 5:
-                break
-
-        # just before you call generate_executive_summary:
         product_name = state["input_data"]["product_name"]
-        k = len(top_materials)  # number of top materials you're iterating over
         location = state["input_data"]["packaging_location"]
 
-        # Generate material-wise executive summaries
-        material_summaries = []
-        for material in top_materials:
-            summary = await orchestrator.generate_executive_summary(
+        async with agent_pool.acquire(OrchestrationAgent, CURRENT_TIME, CURRENT_USER) as orchestrator:
+            orchestrator.set_properties_context(state.get("properties_analysis"))
+
+            # Generate material-wise executive summaries
+            material_summaries = await generate_material_summaries(
+                orchestrator,
                 product_name,
-                k,
                 location,
-                material)
-            material_summaries.append({
-                "material_name": material["material_name"],
-                "summary": summary})
-
-
-        # Prepare final results
-        final_results = {
-            "product_name": state["input_data"]["product_name"],
-            "timestamp": CURRENT_TIME,
-            "user": CURRENT_USER,
-            "weights_used": ANALYSIS_WEIGHTS,
-            "top_materials": top_materials,
-            "all_materials": scored_materials,
-            "material_summaries": material_summaries,
-        }
+                top_materials,
+                shared=(config or {}).get("configurable", {}).get("shared"),
+                input_data=state["input_data"]
+            )
+
+
+            # Prepare final results
+            final_results = {
+                "product_name": state["input_data"]["product_name"],
+                "timestamp": CURRENT_TIME,
+                "user": CURRENT_USER,
+                "weights_used": ANALYSIS_WEIGHTS,
+                "top_materials": top_materials,
+                "all_materials": scored_materials,
+                "material_summaries": material_summaries,
+                "deadline_misses": state.get("deadline_misses") or [],
+                **coverage
+            }
 
-        # Save report
-        report_path = orchestrator._save_report(final_results, "analysis_report")
-        final_results["report_path"] = report_path
+            # Save report
+            report_path = orchestrator._save_report(final_results, "analysis_report")
+            final_results["report_path"] = report_path
 
         return {
             "final_results": final_results,
@@ -429,14 +537,76 @@ async def orchestrate_results(state: AnalysisState) -> Dict:
             "orchestration_status": "failed"
         }
 
+async def rescore_results(
+    state: Dict[str, Any],
+    weights: Dict[str, float],
+    summary_cache: Optional[Dict[str, Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    """
+    Re-rank a finished run under new weights without re-running the analysts.
+
+    Only materials promoted into the top list that have no summary yet get a
+    new executive summary; everything else is reused.
+
+    Args:
+        state: Final graph state of a completed run.
+        weights: New per-dimension weights.
+        summary_cache: Summaries by material name; updated in place when given
+            so demoted-then-repromoted materials are not summarised twice.
+
+    Returns:
+        A `final_results` dict shaped like the one from `orchestrate_results`.
+    """
+    summary_cache = summary_cache if summary_cache is not None else {}
+    previous = state.get("final_results", {})
+    for entry in previous.get("material_summaries", []):
+        if "error" not in entry.get("summary", {}):
+            summary_cache.setdefault(entry["material_name"], entry["summary"])
+
+    weights, coverage = degraded_weights(state, {**resolve_analysis_weights(state["input_data"]), **weights})
+    scored_materials, top_materials = score_materials(state, weights)
+
+    fresh = {}
+    promoted = [m for m in top_materials if m["material_name"] not in summary_cache]
+    if promoted:
+        logger.info(f"Summarising {len(promoted)} newly promoted materials")
+        async with agent_pool.acquire(OrchestrationAgent, CURRENT_TIME, CURRENT_USER) as orchestrator:
+            orchestrator.set_properties_context(state.get("properties_analysis"))
+            for entry in await generate_material_summaries(
+                orchestrator,
+                state["input_data"]["product_name"],
+                state["input_data"]["packaging_location"],
+                promoted
+            ):
+                fresh[entry["material_name"]] = entry["summary"]
+                if "error" not in entry["summary"]:
+                    summary_cache[entry["material_name"]] = entry["summary"]
+
+    final_results = {k: v for k, v in previous.items() if k not in ("report_path", "requested_weights")}
+    final_results.update({
+        **coverage,
+        "weights_used": weights,
+        "top_materials": top_materials,
+        "all_materials": scored_materials,
+        "material_summaries": [
+            {
+                "material_name": m["material_name"],
+                "summary": summary_cache.get(m["material_name"]) or fresh.get(m["material_name"], {})
+            }
+            for m in top_materials
+        ],
+    })
+    return final_results
+
 
 async def handle_error(state: AnalysisState) -> Dict:
     """Handle errors and generate error reports."""
-    logger.error(f"Error handler: {state.get('error', 'Unknown error')}")
+    error = state.get("error") or "; ".join(
+        f"{node}: {msg}" for node, msg in (state.get("dimension_errors") or {}).items()
+    ) or "Unknown error"
+    logger.error(f"Error handler: {error}")
     
     try:
-        orchestrator = OrchestrationAgent(CURRENT_TIME, CURRENT_USER)
-
         status_info = {
             "input": state.get("input_status", "unknown"),
             "compatibility": state.get("compatibility_status", "unknown"),
@@ -449,21 +619,24 @@ async def handle_error(state: AnalysisState) -> Dict:
             "orchestration": state.get("orchestration_status", "unknown")
         }
 
-        error_analysis = await orchestrator.analyze_error(
-            state.get("error", "Unknown error"),
-            status_info
-        )
+        async with agent_pool.acquire(OrchestrationAgent, CURRENT_TIME, CURRENT_USER) as orchestrator:
+            orchestrator.set_properties_context(None)
+            error_analysis = await orchestrator.analyze_error(
+                error,
+                status_info
+            )
 
-        error_report = {
-            "error": state.get("error", "Unknown error"),
-            "user": CURRENT_USER,
-            "timestamp": CURRENT_TIME,
-            "status": status_info,
-            "error_analysis": error_analysis
-        }
+            error_report = {
+                "error": error,
+                "user": CURRENT_USER,
+                "timestamp": CURRENT_TIME,
+                "status": status_info,
+                "deadline_misses": state.get("deadline_misses") or [],
+                "error_analysis": error_analysis
+            }
 
-        report_path = orchestrator._save_report(error_report, "error_report")
-        error_report["report_path"] = report_path
+            report_path = orchestrator._save_report(error_report, "error_report")
+            error_report["report_path"] = report_path
 
         return {"final_results": error_report}
 
@@ -486,36 +659,37 @@ def route_after_material_db(state: AnalysisState) -> Literal["run_analyses", "ha
 def check_analyses_completion(state: AnalysisState) -> Literal["orchestrate", "handle_error"]:
     if state.get("error"):
         return "handle_error"
-    
-    required_statuses = {
-        "properties_status": "completed",
-        "logistics_status": "completed",
-        "costs_status": "completed",
-        "sustainability_status": "completed",
-        "consumer_status": "completed"
-    }
-    
-    for status_key, expected_value in required_statuses.items():
-        if state.get(status_key) != expected_value:
-            return "handle_error"
-            
+
+    completed = [node for node in ANALYST_OUTPUTS if state.get(f"{node}_status") == "completed"]
+    if len(completed) < MIN_COMPLETED_ANALYSES:
+        return "handle_error"
+    if len(completed) < len(ANALYST_OUTPUTS):
+        logger.warning(f"Only {len(completed)}/{len(ANALYST_OUTPUTS)} analyses completed; orchestrating a partial result")
+
     return "orchestrate"
 
-def create_analysis_graph():
-    """Create and configure the analysis workflow graph."""
+def create_analysis_graph(checkpointer: Optional[BaseCheckpointSaver] = None):
+    """
+    Create and configure the analysis workflow graph.
+
+    Args:
+        checkpointer: Where node-by-node state is saved; the process-wide
+            bounded in-memory saver when omitted. Pass the durable one from
+            `open_checkpointer()` to make runs resumable across processes.
+    """
     workflow = StateGraph(AnalysisState)
 
     # Add nodes
-    workflow.add_node("input", process_input)
-    workflow.add_node("compatibility", analyze_product_compatibility)
-    workflow.add_node("material_db", query_material_database)
-    workflow.add_node("properties", analyze_material_properties)
-    workflow.add_node("logistics", analyze_logistics)
-    workflow.add_node("costs", analyze_costs)
-    workflow.add_node("sustainability", analyze_sustainability)
-    workflow.add_node("consumer", analyze_consumer_behavior)
-    workflow.add_node("orchestrator", orchestrate_results)
-    workflow.add_node("error_handler", handle_error)
+    workflow.add_node("input", timed_node("input", process_input))
+    workflow.add_node("compatibility", timed_node("compatibility", analyze_product_compatibility))
+    workflow.add_node("material_db", timed_node("material_db", query_material_database))
+    workflow.add_node("properties", timed_node("properties", analyze_material_properties))
+    workflow.add_node("logistics", timed_node("logistics", analyze_logistics))
+    workflow.add_node("costs", timed_node("costs", analyze_costs))
+    workflow.add_node("sustainability", timed_node("sustainability", analyze_sustainability))
+    workflow.add_node("consumer", timed_node("consumer", analyze_consumer_behavior))
+    workflow.add_node("orchestrator", timed_node("orchestrator", orchestrate_results))
+    workflow.add_node("error_handler", timed_node("error_handler", handle_error))
 
     # Linear flow
     workflow.add_edge("input", "compatibility")
@@ -553,7 +727,138 @@ def create_analysis_graph():
     workflow.add_edge("error_handler", END)
 
     workflow.set_entry_point("input")
-    return workflow.compile(checkpointer=MemorySaver())
+    return workflow.compile(checkpointer=checkpointer or get_memory_saver())
+
+async def backfill_analysis(thread_id: str, graph) -> Dict[str, Any]:
+    """
+    Re-run only the analysts a degraded run is missing, then re-rank with them.
+
+    The completed analyses are reused as stored, and so are the executive
+    summaries of materials that stay in the top list.
+
+    Args:
+        thread_id: Session ID of a run that finished in degraded mode.
+        graph: Graph compiled with the checkpointer the run was saved to.
+
+    Returns:
+        The updated final graph state.
+    """
+    config = {"configurable": {"thread_id": thread_id}}
+    state = (await graph.aget_state(config)).values
+    missing = [node for node in ANALYST_OUTPUTS if state.get(f"{node}_status") != "completed"]
+    if not missing:
+        return state
+
+    logger.info(f"Backfilling {', '.join(missing)} for session {thread_id}")
+    run_config = {"configurable": {**config["configurable"], "deadline_at": run_deadline_at()}}
+    update: Dict[str, Any] = {"dimension_errors": {}}
+    for node_update in await asyncio.gather(
+        *(timed_node(node, ANALYST_NODES[node])(state, run_config) for node in missing)
+    ):
+        errors = {**update["dimension_errors"], **node_update.get("dimension_errors", {})}
+        misses = update.get("deadline_misses", []) + node_update.get("deadline_misses", [])
+        update.update(node_update)
+        update["dimension_errors"] = errors
+        if misses:
+            update["deadline_misses"] = misses
+
+    merged = {
+        **state,
+        **update,
+        "dimension_errors": merge_dimension_errors(state.get("dimension_errors"), update["dimension_errors"])
+    }
+    final_results = await rescore_results(merged, {})
+    async with agent_pool.acquire(OrchestrationAgent, CURRENT_TIME, CURRENT_USER) as orchestrator:
+        with run_scope(thread_id):
+            final_results["report_path"] = orchestrator._save_report(final_results, "analysis_report")
+
+    await graph.aupdate_state(config, {**update, "final_results": final_results}, as_node="orchestrator")
+    return (await graph.aget_state(config)).values
+
+async def resume_analysis(thread_id: str, graph) -> Dict[str, Any]:
+    """
+    Continue an interrupted run from its last checkpoint.
+
+    A run that stopped mid-graph picks up at the nodes that had not completed.
+    A run that finished with a failed orchestration re-runs only that step on
+    the stored analyst outputs, and a run that finished in degraded mode
+    backfills its missing analyses.
+
+    Args:
+        thread_id: Session ID of the run to resume.
+        graph: Graph compiled with the checkpointer the run was saved to.
+
+    Returns:
+        The final graph state.
+    """
+    config = {"configurable": {"thread_id": thread_id}}
+    snapshot = await graph.aget_state(config)
+    if not snapshot.values:
+        raise ValueError(f"No checkpoint found for session {thread_id}")
+
+    if snapshot.next:
+        logger.info(f"Resuming session {thread_id} at: {', '.join(snapshot.next)}")
+        # A resumed run gets a fresh budget rather than the original's expired one
+        config["configurable"]["deadline_at"] = run_deadline_at()
+        return await graph.ainvoke(None, config)
+
+    state = snapshot.values
+    if state.get("orchestration_status") == "failed":
+        logger.info(f"Re-running orchestration for session {thread_id}")
+        with run_scope(thread_id):
+            update = await orchestrate_results(state)
+        await graph.aupdate_state(config, update, as_node="orchestrator")
+        state = (await graph.aget_state(config)).values
+        if state.get("orchestration_status") == "completed":
+            # The failed attempt's message stays in the append-only error channel
+            state = {k: v for k, v in state.items() if k != "error"}
+    elif state.get("final_results", {}).get("degraded"):
+        state = await backfill_analysis(thread_id, graph)
+    else:
+        logger.info(f"Session {thread_id} already finished; returning stored results")
+    return state
+
+async def stream_analysis(
+    initial_state: Dict[str, Any],
+    config: Dict[str, Any],
+    graph=None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run the analysis graph and yield progress events as nodes start and finish.
+
+    Yields dicts of the form:
+      - {"event": "node_start", "node": name}
+      - {"event": "material", "node": name, "material": {...}} as soon as an
+        analyst's material has streamed in, ahead of its node_end
+      - {"event": "node_end", "node": name, "update": {...}, "error": str or None}
+      - {"event": "done", "result": final_state}
+    """
+    graph = graph or create_analysis_graph()
+    final_state: Dict[str, Any] = {}
+    async for mode, payload in graph.astream(initial_state, config, stream_mode=["debug", "values", "custom"]):
+        if mode == "values":
+            final_state = payload
+            continue
+        if mode == "custom":
+            if "material" in payload:
+                yield {"event": "material", **payload}
+            continue
+
+        name = payload.get("payload", {}).get("name")
+        if name not in PROGRESS_NODES:
+            continue
+        if payload["type"] == "task":
+            yield {"event": "node_start", "node": name}
+        elif payload["type"] == "task_result":
+            yield {
+                "event": "node_end",
+                "node": name,
+                "update": dict(payload["payload"].get("result") or []),
+                "error": payload["payload"].get("error")
+            }
+
+    mark_finished(graph, config["configurable"]["thread_id"])
+    yield {"event": "done", "result": final_state}
 
 def print_results(result: Dict[str, Any], thread_id: str):
     """Print analysis results including performance reviews for multiple materials."""
@@ -582,6 +887,14 @@ def print_results(result: Dict[str, Any], thread_id: str):
     print("=======================")
     print(f"Session ID: {thread_id}")
     print(f"Timestamp: {CURRENT_TIME}")
+    if TRACING_ENABLED:
+        print(f"Trace: {get_tracer().trace_path(thread_id)} (view with: python -m agents.tracing <file>)")
+
+    if missing := results.get("missing_dimensions"):
+        print("\n⚠️ Partial result: ranked without these analyses (weights renormalised):")
+        for dim, reason in missing.items():
+            print(f"  • {dim}: {reason}")
+        print(f"Backfill them with: python main.py --resume {thread_id}")
 
     if materials := results.get("material_summaries", []):
         print("\nSustainability Analysis Report")
@@ -648,9 +961,9 @@ def print_results(result: Dict[str, Any], thread_id: str):
 
 
 
-async def main():
+async def main(resume: Optional[str] = None):
     """Main execution function."""
-    thread_id = f"{CURRENT_USER}-{int(datetime.now(timezone.utc).timestamp())}"
+    thread_id = resume or new_run_id(CURRENT_USER)
     
     # Set up logging
     log_filename = f"analysis_log_{CURRENT_TIME.replace(' ', '_').replace(':', '-')}.log"
@@ -667,17 +980,22 @@ async def main():
     logger.info(f"Analysis timestamp: {CURRENT_TIME}")
 
     try:
-        graph = create_analysis_graph()
-        result = await graph.ainvoke(
-            {},
-            config={
-                "configurable": {
-                    "thread_id": thread_id,
-                    "timestamp": CURRENT_TIME,
-                    "user": CURRENT_USER
-                }
-            }
-        )
+        async with open_checkpointer() as checkpointer:
+            graph = create_analysis_graph(checkpointer)
+            if resume:
+                result = await resume_analysis(thread_id, graph)
+            else:
+                result = await graph.ainvoke(
+                    {},
+                    config={
+                        "configurable": {
+                            "thread_id": thread_id,
+                            "timestamp": CURRENT_TIME,
+                            "user": CURRENT_USER
+                        }
+                    }
+                )
+            await prune_checkpoints(checkpointer, graph)
 
         # Print results
         print_results(result, thread_id)
@@ -692,15 +1010,22 @@ async def main():
         print(f"Session ID: {thread_id}")
         print("Please check the log file for detailed error information.")
         print(f"Log File: {log_filename}")
+        print(f"Resume with: python main.py --resume {thread_id}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sustainable packaging material analysis")
+    parser.add_argument("--resume", metavar="THREAD_ID", help="resume an interrupted session from its last checkpoint")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="serve Prometheus metrics at http://127.0.0.1:<port>/metrics (or set AGENT_METRICS_PORT)")
+    args = parser.parse_args()
+    serve_metrics(args.metrics_port)
+
     # Create necessary directories
     os.makedirs("temp_KB", exist_ok=True)
-    os.makedirs("temp_KB/reports", exist_ok=True)
     os.makedirs("logs", exist_ok=True)
     
     # Update current time and user
     CURRENT_TIME = "2025-05-09 21:04:45"  # Updated with provided time
     
     # Run analysis
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main(resume=args.resume))
\ No newline at end of file